@@ -1,7 +1,52 @@
+import logging
+import math
+import os
+import threading
 import streamlit as st
-from main import run_business_builder
+from bson import ObjectId
+from main import get_client_pools, run_business_builder, translate_business_analysis
 from translations import UI_TRANSLATIONS
 from utils.database import Database
+from utils.file_manager import get_file_manager
+from utils.rate_limiter import create_rate_limiter
+from utils.scheduler import plan_weight
+from utils.variants import plan_variants
+from utils.run_status import start_run, get_run, active_run, dismiss_run, RunTracker
+from utils.warmup import start_health, start_warmup
+
+logger = logging.getLogger(__name__)
+
+# Analyses a user may start per hour
+ANALYSIS_RATE_LIMIT = int(os.getenv("ANALYSIS_RATE_LIMIT", "10"))
+
+# Estimated similarity above which an idea counts as a near-duplicate of an earlier one
+DUPLICATE_THRESHOLD = float(os.getenv("DUPLICATE_THRESHOLD", "0.7"))
+
+# Stages reused from a near-duplicate, later stages are regenerated for the new wording
+REUSABLE_STAGES = ("clarity", "niche")
+
+# Seconds between progress updates while an analysis runs
+RUN_POLL_SECONDS = 2
+
+STAGE_TITLES = {
+    "clarity": "clarity_analysis",
+    "niche": "niche_strategy",
+    "action": "action_plan",
+    "strategy": "business_strategy"
+}
+
+
+class _AnalysisThreadFilter(logging.Filter):
+    """st.* calls are no-ops in analysis threads, which have no script run context; don't warn about each"""
+
+    def filter(self, record):
+        return not record.threadName.startswith("analysis-")
+
+
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(_AnalysisThreadFilter())
+
+# Health checks can come before anyone logs in, the endpoint starts with the process when HEALTH_PORT is set
+start_health(get_client_pools, lambda: Database().client)
 
 # Configure the page layout
 st.set_page_config(layout="wide", initial_sidebar_state="expanded")
@@ -56,6 +101,126 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
+def run_analysis(db, user, business_idea, lang_code, texts, reuse_stages=None, translate_from=None):
+    """Start a paid analysis in the background, its progress is shown from the run status document"""
+    analysis_limiter = create_rate_limiter(
+        db, "analysis", max_attempts=ANALYSIS_RATE_LIMIT, window_seconds=3600, lockout_seconds=3600
+    )
+    locked, remaining = analysis_limiter.is_locked_out(st.session_state["username"])
+    if locked:
+        st.error(texts["too_many_analyses"].format(minutes=math.ceil(remaining / 60)))
+        return
+    analysis_limiter.record_attempt(st.session_state["username"])
+
+    idea_id = str(ObjectId())
+    run_id = start_run(db, st.session_state["username"], idea_id, business_idea, lang_code)
+    # The run must outlive this script run, a reload or closed tab would stop it
+    threading.Thread(
+        target=analysis_worker,
+        name=f"analysis-{run_id}",
+        args=(run_id, user, business_idea, lang_code),
+        kwargs={
+            "idea_id": idea_id,
+            "reuse_stages": reuse_stages,
+            "translate_from": translate_from,
+            "profile": st.session_state.get("is_admin", False) and st.session_state.get("profile_runs", False)
+        },
+        daemon=True
+    ).start()
+    st.rerun()
+
+def analysis_worker(run_id, user, business_idea, lang_code, idea_id, reuse_stages=None, translate_from=None, profile=False):
+    """Run an analysis outside the script thread and record its progress"""
+    db = Database()
+    tracker = RunTracker(db, run_id)
+    try:
+        if translate_from:
+            txt_digest, pdf_digest = translate_business_analysis(
+                business_idea,
+                translate_from,
+                lang_code,
+                user["username"],
+                weight=plan_weight(user),
+                tracker=tracker,
+                idea_id=idea_id
+            )
+        else:
+            txt_digest, pdf_digest = run_business_builder(
+                business_idea,
+                lang_code,
+                user["username"],  # Pass username for saving to MongoDB
+                weight=plan_weight(user),
+                variants=plan_variants(user),
+                reuse_stages=reuse_stages,
+                profile=profile,
+                tracker=tracker,
+                idea_id=idea_id
+            )
+        
+        # Update credits
+        db.update_credits(user["username"], user['credits'] - 1)
+        tracker.finish(txt_digest, pdf_digest)
+    except Exception as e:
+        logger.error(f"Analysis {run_id} for user {user['username']} failed: {e}")
+        tracker.fail(e)
+
+def show_stage_outputs(run, texts):
+    for stage, title in STAGE_TITLES.items():
+        if stage in run["stage_outputs"]:
+            st.write(f"\n=== {texts[title]} ===")
+            st.write(run["stage_outputs"][stage])
+
+@st.fragment(run_every=RUN_POLL_SECONDS)
+def show_run_progress(run_id, texts):
+    """Poll a running analysis, rerunning the whole page once it has finished"""
+    run = get_run(Database(), run_id)
+    if not run or run["status"] != "running":
+        st.rerun()
+    st.write(f"🚀 {texts['processing']}")
+    show_stage_outputs(run, texts)
+    if run["stage"] in STAGE_TITLES:
+        st.write(f"🔄 {texts[STAGE_TITLES[run['stage']]]}...")
+        if run.get("queue_position"):
+            st.write(f"⏳ {texts['queue_position'].format(position=run['queue_position'])}")
+    elif run["stage"] == "translate":
+        st.write(f"🌐 {texts['translating_report']}...")
+    elif run["stage"] == "report":
+        st.write(f"🔄 {texts['generating_report']}...")
+
+def show_run(db, run, texts):
+    """The user's latest analysis: live progress while it runs, the outputs and report once it is done"""
+    if run["status"] == "running":
+        show_run_progress(run["_id"], texts)
+        return
+
+    show_stage_outputs(run, texts)
+    if run["status"] == "done":
+        pdf_digest = run.get("artifacts", {}).get("pdf")
+
+        def load_pdf():
+            # Stored on another replica, or evicted since
+            reports = db.get_idea_reports(run["idea_id"])
+            return reports and reports.get("pdf_report")
+
+        if pdf_digest or db.has_idea(run["idea_id"]):
+            # Read only when clicked, the page keeps no copy of the report
+            st.download_button(
+                label=texts["download_report"],
+                data=get_file_manager().deferred(pdf_digest, load_pdf),
+                file_name=f"business_analysis_{run['idea_id']}.pdf",
+                mime="application/pdf"
+            )
+        else:
+            st.info(texts["report_saving"])
+    elif run.get("error_type") == "PoolExhausted":
+        st.error(f"{texts['llm_unavailable']} ({run['error']})")
+    else:
+        st.error(f"{texts['error_occurred']}: {run['error']}")
+
+    if st.button(texts["new_analysis"]):
+        dismiss_run(db, run["_id"])
+        st.rerun()
+
 def secure_main():
     """Main function with authentication"""
     # Initialize database connection
@@ -92,15 +257,26 @@ def secure_main():
                 submitted = st.form_submit_button(texts["login_button"])
                 
                 if submitted:
+                    login_limiter = create_rate_limiter(db, "login")
+                    locked, remaining = login_limiter.is_locked_out(username)
+                    if locked:
+                        st.error(texts["too_many_attempts"].format(minutes=math.ceil(remaining / 60)))
+                        return
+
                     user = db.verify_user(username, password)
                     if user:
+                        login_limiter.reset(username)
                         st.session_state['authentication_status'] = True
                         st.session_state['username'] = user['username']
                         st.session_state['name'] = user['name']
                         st.session_state['is_admin'] = user.get('is_admin', False)
                         st.rerun()
                     else:
-                        st.error(texts["invalid_credentials"])
+                        locked, minutes = login_limiter.record_attempt(username)
+                        if locked:
+                            st.error(texts["too_many_attempts"].format(minutes=minutes))
+                        else:
+                            st.error(texts["invalid_credentials"])
         return
     
     # Get user information
@@ -110,6 +286,10 @@ def secure_main():
         st.session_state['authentication_status'] = None
         st.rerun()
 
+    # Open the LLM connections while the first user types an idea, once per process.
+    # Not on the login page, which must not wait for the OpenAI SDK to load
+    start_warmup(get_client_pools, lambda: Database().client)
+
     # Sidebar with logout and navigation
     with st.sidebar:
         st.write(f'{texts["welcome"]} *{st.session_state["name"]}*')
@@ -133,6 +313,8 @@ def secure_main():
             st.divider()
             st.markdown(f"### {texts['admin_menu']}")
             st.page_link("pages/01_user_management.py", label=texts["user_management"])
+            st.page_link("pages/03_analytics.py", label=texts["analytics"])
+            st.toggle(texts["profile_runs"], key="profile_runs", help=texts["profile_runs_help"])
         
         st.divider()
         
@@ -143,13 +325,18 @@ def secure_main():
             st.rerun()
         
         # Credits display
-        credits_placeholder = st.empty()
-        credits_placeholder.write(f"**{texts['credits_remaining']}:** {user['credits']}")
+        st.write(f"**{texts['credits_remaining']}:** {user['credits']}")
 
     # Main app content
     with st.container():
         st.title(texts["title"])
 
+        # Reattach to a running or unseen analysis instead of starting a second one
+        run = active_run(db, st.session_state["username"])
+        if run:
+            show_run(db, run, texts)
+            return
+
         # Business idea input
         business_idea = st.text_area(texts["business_idea_label"], height=150)
         
@@ -161,29 +348,59 @@ def secure_main():
             if user['credits'] <= 0:
                 st.error(texts["no_credits"])
                 return
-                
-            try:
-                # Run the analysis
-                txt_file, pdf_file = run_business_builder(
-                    business_idea,
-                    lang_code,
-                    st.session_state["username"]  # Pass username for saving to MongoDB
-                )
-                
-                # Update credits
-                db.update_credits(st.session_state["username"], user['credits'] - 1)
-                credits_placeholder.write(f"**{texts['credits_remaining']}:** {user['credits'] - 1}")
-                
-                # Offer downloads
+
+            # Offer an earlier report when the idea is a near-duplicate
+            similar_idea = db.find_similar_idea(st.session_state["username"], business_idea, DUPLICATE_THRESHOLD)
+            if similar_idea:
+                st.session_state["similar_idea"] = similar_idea
+            else:
+                st.session_state.pop("similar_idea", None)
+                run_analysis(db, user, business_idea, lang_code, texts)
+                return
+
+        similar_idea = st.session_state.get("similar_idea")
+        if similar_idea:
+            st.info(texts["similar_idea_found"].format(
+                similarity=int(similar_idea["similarity"] * 100),
+                created_at=similar_idea["created_at"].strftime("%Y-%m-%d %H:%M")
+            ))
+            st.write(similar_idea["idea_text"])
+
+            # An analysis of the same idea in the other language only needs translating
+            can_translate = similar_idea.get("stage_outputs") and similar_idea.get("language") != lang_code
+            existing_col, reuse_col, full_col = st.columns(3)
+            with existing_col:
                 st.download_button(
-                    label=texts["download_report"],
-                    data=open(pdf_file, "rb"),
-                    file_name=pdf_file,
+                    texts["download_existing_report"],
+                    data=get_file_manager().deferred(
+                        (similar_idea.get("artifacts") or {}).get("pdf"),
+                        lambda: (db.get_idea_reports(similar_idea["idea_id"]) or {}).get("pdf_report")
+                    ),
+                    file_name=f"report_{similar_idea['idea_id']}.pdf",
                     mime="application/pdf"
                 )
-                
-            except Exception as e:
-                st.error(f"{texts['error_occurred']}: {str(e)}")
+            with reuse_col:
+                # Reports saved before stage outputs were stored can only be re-run in full,
+                # stages in the other language are translated rather than reused
+                reuse_clicked = similar_idea.get("stage_outputs") and not can_translate and st.button(texts["rerun_reusing_stages"])
+            with full_col:
+                full_clicked = st.button(texts["run_full_analysis"])
+            translate_clicked = can_translate and st.button(
+                texts["translate_earlier_report"], help=texts["translate_earlier_report_help"]
+            )
+
+            if translate_clicked:
+                del st.session_state["similar_idea"]
+                run_analysis(db, user, business_idea, lang_code, texts, translate_from=similar_idea)
+            elif reuse_clicked or full_clicked:
+                del st.session_state["similar_idea"]
+                reuse_stages = None
+                if reuse_clicked:
+                    reuse_stages = {
+                        stage: similar_idea["stage_outputs"][stage]
+                        for stage in REUSABLE_STAGES
+                    }
+                run_analysis(db, user, business_idea, lang_code, texts, reuse_stages)
 
 if __name__ == "__main__":
     secure_main() 
\ No newline at end of file
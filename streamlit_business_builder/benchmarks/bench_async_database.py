@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+import pytest
+
+from bench_database import PDF_BLOB, TXT_BLOB
+from sample_outputs import SAMPLE_IDEA
+
+REPORTS_PER_PAGE = 20
+
+# mongomock has no asyncio client, this comparison needs a real mongod
+pytestmark = pytest.mark.skipif(not os.getenv("BENCH_MONGODB_URI"), reason="BENCH_MONGODB_URI not set")
+
+
+@pytest.fixture
+def seeded_db(bench_db):
+    bench_db.users.insert_one({"username": "pageuser", "username_lower": "pageuser", "name": "Page User",
+                               "email": "page@example.com", "credits": 5})
+    for i in range(REPORTS_PER_PAGE):
+        bench_db.save_business_idea("pageuser", f"{SAMPLE_IDEA} #{i}", PDF_BLOB, TXT_BLOB, "en")
+    return bench_db
+
+
+def _load_page_sequential(db):
+    """Report history page load with the synchronous Database"""
+    db.get_user("pageuser")
+    ideas = db.get_user_ideas("pageuser")
+    return [db.get_idea_reports(idea["idea_id"]) for idea in ideas]
+
+
+async def _load_page_concurrent(db):
+    """The same page load with independent queries fanned out"""
+    _, ideas = await asyncio.gather(db.get_user("pageuser"), db.get_user_ideas("pageuser"))
+    return await asyncio.gather(*(db.get_idea_reports(idea["idea_id"]) for idea in ideas))
+
+
+def bench_page_load(bench, seeded_db):
+    from utils.async_database import AsyncDatabase
+
+    sequential = bench("page_load[sequential]", _load_page_sequential, seeded_db, rounds=10)
+
+    async def run_concurrent_rounds():
+        db = AsyncDatabase()
+        loop = asyncio.get_running_loop()
+        results = []
+        try:
+            # Timed inside the loop so the client and its pool are reused across rounds
+            for _ in range(10):
+                start = loop.time()
+                reports = await _load_page_concurrent(db)
+                results.append(loop.time() - start)
+        finally:
+            await db.client.close()
+        return reports, results
+
+    reports, timings = asyncio.run(run_concurrent_rounds())
+    bench.record("page_load[concurrent]", sorted(timings)[len(timings) // 2])
+    assert len(reports) == len(sequential) == REPORTS_PER_PAGE
@@ -0,0 +1,66 @@
+import itertools
+
+from sample_outputs import SAMPLE_IDEA
+from utils.archive import archive_old_reports
+
+PDF_BLOB = b"%PDF-1.4\n" + b"0" * 200_000
+TXT_BLOB = "report " * 20_000
+
+
+def _seed_users(db, count):
+    for i in range(count):
+        db.users.insert_one({
+            "username": f"user{i}",
+            "username_lower": f"user{i}",
+            "password": b"not-a-real-hash",
+            "email": f"user{i}@example.com",
+            "name": f"User {i}",
+            "credits": 5,
+            "is_admin": False,
+        })
+
+
+def _seed_ideas(db, count, users=10):
+    for i in range(count):
+        db.save_business_idea(f"user{i % users}", f"{SAMPLE_IDEA} #{i}", PDF_BLOB, TXT_BLOB, "en")
+
+
+def bench_create_user(bench, bench_db):
+    counter = itertools.count()
+
+    def create_next_user():
+        i = next(counter)
+        return bench_db.create_user(f"bench{i}", "Sup3r-Secret!pw", f"bench{i}@example.com", "Bench")
+
+    # A single bcrypt hash dominates this timing
+    bench("create_user", create_next_user, rounds=3)
+
+
+def bench_user_lookups(bench, bench_db):
+    _seed_users(bench_db, 500)
+    bench("get_user", bench_db.get_user, "user250", rounds=20)
+    bench("update_credits", bench_db.update_credits, "user250", 3, rounds=20)
+    bench("list_users[500]", bench_db.list_users, rounds=5)
+
+
+def bench_save_business_idea(bench, bench_db):
+    bench("save_business_idea", bench_db.save_business_idea, "user1", SAMPLE_IDEA, PDF_BLOB, TXT_BLOB, "en", rounds=10)
+
+
+def bench_idea_queries(bench, bench_db):
+    _seed_ideas(bench_db, 200)
+    idea_ids = [idea["idea_id"] for idea in bench_db.get_all_ideas()]
+    bench("get_user_ideas", bench_db.get_user_ideas, "user1", rounds=10)
+    bench("get_all_ideas[200]", bench_db.get_all_ideas, rounds=5)
+    bench("get_idea_reports", bench_db.get_idea_reports, idea_ids[0], rounds=20)
+    bench("get_multiple_reports[20]", bench_db.get_multiple_reports, idea_ids[:20], rounds=5)
+
+
+def bench_archived_reports(bench, bench_db):
+    _seed_ideas(bench_db, 50)
+    idea_ids = [idea["idea_id"] for idea in bench_db.get_all_ideas()]
+    stats = bench("archive_old_reports[50]", archive_old_reports, bench_db, older_than_days=-1, rounds=1, warmup=0)
+    assert stats["ideas"] == 50
+    assert bench_db.get_idea_reports(idea_ids[0])["pdf_report"] == PDF_BLOB
+    bench("get_idea_reports[archived]", bench_db.get_idea_reports, idea_ids[0], rounds=20)
+    bench("get_multiple_reports[20 archived]", bench_db.get_multiple_reports, idea_ids[:20], rounds=5)
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+from conftest import APP_DIR, RESULTS_DIR
+
+# Modules the login page must not load, they are only needed once an analysis runs
+DEFERRED_MODULES = ("reportlab", "openai")
+
+
+def _profile_import(module):
+    """Import a module in a fresh interpreter with -X importtime"""
+    code = (
+        "import logging, sys; logging.disable(logging.WARNING); "
+        f"import {module}; "
+        f"print(','.join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))"
+    )
+    # Default settings, the warm-up only starts after login and must not load anything here
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting is shown as two spaces per level after the separator
+        name = name[1:].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return proc.stderr, entries, loaded
+
+
+def bench_import_app(bench):
+    report, entries, loaded = _profile_import("app")
+
+    # Direct imports of the app module, plus interpreter startup at depth 0
+    app_imports = [e for e in entries if e[1] == 1]
+    slowest = sorted(app_imports, key=lambda e: e[3], reverse=True)[:15]
+    total = sum(e[3] for e in entries if e[1] == 0)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, "importtime_app.txt"), "w", encoding="utf-8") as f:
+        f.write(report)
+
+    bench.record(
+        "import app",
+        total / 1_000_000,
+        slowest_imports=[{"module": name, "cumulative_ms": cumulative / 1000} for name, _, _, cumulative in slowest],
+        deferred_modules_loaded=loaded,
+    )
+    assert not loaded, f"Login page imports {loaded}, which should be loaded lazily"
@@ -0,0 +1,48 @@
+import time
+
+from pdf_generator import clean_text, format_text_to_paragraphs, create_pdf_report, ReportBuilder
+from sample_outputs import SAMPLE_IDEA
+
+
+def bench_clean_text(bench, stage_outputs):
+    bench("clean_text[strategy]", clean_text, stage_outputs["strategy"], rounds=20)
+
+
+def bench_format_text_to_paragraphs(bench, stage_outputs):
+    bench("format_text_to_paragraphs[strategy]", format_text_to_paragraphs, stage_outputs["strategy"], rounds=20)
+
+
+def bench_create_pdf_report(bench, stage_outputs, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    bench(
+        "create_pdf_report",
+        create_pdf_report,
+        "bench_report",
+        SAMPLE_IDEA,
+        stage_outputs["clarity"],
+        stage_outputs["niche"],
+        stage_outputs["action"],
+        stage_outputs["strategy"],
+        "en",
+        "bench",
+        rounds=3,
+    )
+
+
+def bench_report_builder_build(bench, stage_outputs, tmp_path, monkeypatch):
+    """
+    What is left after the last agent returns: the strategy section, the only one the PDF shows,
+    and the layout. Compare with create_pdf_report for the gain of preparing the rest up front.
+    """
+    monkeypatch.chdir(tmp_path)
+    timings = []
+    for _ in range(3):
+        builder = ReportBuilder(SAMPLE_IDEA, "en", "bench")
+        for stage, output in stage_outputs.items():
+            if stage != "strategy":
+                builder.add_stage(stage, output)
+        started = time.perf_counter()
+        builder.add_stage("strategy", stage_outputs["strategy"])
+        builder.build("bench_report")
+        timings.append(time.perf_counter() - started)
+    bench.record("report_builder.add_stage(strategy)+build", min(timings))
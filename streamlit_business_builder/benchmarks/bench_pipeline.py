@@ -0,0 +1,81 @@
+import logging
+
+import pytest
+import streamlit
+
+from sample_outputs import SAMPLE_IDEA
+
+# Streamlit warns about the missing script run context on every st.* call
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+
+@pytest.fixture
+def pipeline(monkeypatch, tmp_path, fake_llm, bench_db):
+    """main module wired to the fake LLM client and the benchmark database"""
+    monkeypatch.setattr(streamlit, "secrets", {"DEEPSEEK_API_KEY": "bench"})
+    import main
+
+    import utils.file_manager as file_manager
+    import utils.report_writer as report_writer
+    from utils.client_pool import ClientPool
+
+    monkeypatch.setattr(main, "_pools", {"deepseek": ClientPool([("bench", 0, fake_llm)])})
+    monkeypatch.setattr(main, "Database", lambda: bench_db)
+    monkeypatch.setattr(report_writer, "_writer", None)
+    monkeypatch.setenv("REPORT_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(file_manager, "_file_manager", None)
+    monkeypatch.setenv("ARTIFACT_DIR", str(tmp_path / "artifacts"))
+    monkeypatch.chdir(tmp_path)
+    yield main
+    # Reports are persisted in the background, finish before the database is dropped
+    report_writer.get_report_writer(main.Database).flush(timeout=30)
+
+
+def bench_run_business_builder(bench, pipeline, fake_llm):
+    bench("run_business_builder", pipeline.run_business_builder, SAMPLE_IDEA, "en", "bench", rounds=3)
+    assert fake_llm.calls == 4 * 4  # warmup + rounds, four agents each
+
+
+def bench_report_persistence(bench, pipeline, bench_db):
+    """Time until a finished analysis is stored in business_ideas"""
+    import utils.report_writer as report_writer
+
+    def run_and_persist():
+        pipeline.run_business_builder(SAMPLE_IDEA, "en", "bench")
+        report_writer.get_report_writer(pipeline.Database).flush(timeout=30)
+
+    bench("run_business_builder+persist", run_and_persist, rounds=3)
+    assert bench_db.business_ideas.count_documents({}) == 4
+
+
+def bench_save_business_analysis(bench, pipeline, stage_outputs):
+    bench(
+        "save_business_analysis",
+        pipeline.save_business_analysis,
+        SAMPLE_IDEA,
+        stage_outputs["clarity"],
+        stage_outputs["niche"],
+        stage_outputs["action"],
+        stage_outputs["strategy"],
+        "en",
+        "bench",
+        rounds=3,
+    )
+
+
+def bench_best_of_n(bench, pipeline, fake_llm, bench_db):
+    """Strategy stage generated BEST_OF_N times at once for a premium user, wall time should stay close to one call"""
+    from utils.variants import BEST_OF_N, plan_variants
+
+    # Plans as the admin form and the bulk import store them
+    bench_db.create_user("premium_user", "bench", "premium@example.com", "Premium", plan="premium")
+    bench_db.create_user("free_user", "bench", "free@example.com", "Free")
+    variants = plan_variants(bench_db.get_user("premium_user"))
+    assert variants == BEST_OF_N > 1
+    assert plan_variants(bench_db.get_user("free_user")) == 1
+
+    stage_usage = {}
+    bench(f"get_agent_response[strategy, {variants} variants]", pipeline.get_agent_response,
+          SAMPLE_IDEA, "strategy", "en", "bench", 1, stage_usage, variants, rounds=3)
+    assert stage_usage["strategy"]["variants"] == variants
+    assert fake_llm.calls == variants * 4
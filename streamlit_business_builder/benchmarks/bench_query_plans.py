@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+from utils.query_audit import audit, seed
+
+# mongomock has no query planner, explain needs a real mongod
+pytestmark = pytest.mark.skipif(not os.getenv("BENCH_MONGODB_URI"), reason="BENCH_MONGODB_URI not set")
+
+
+def bench_query_plans(bench, bench_db):
+    """Fails when a Database query regresses to a collection scan or an in-memory sort"""
+    seed(bench_db, users=500, ideas=500)
+    results = audit(bench_db)
+    for result in results:
+        bench.record(f"explain[{result['name']}]", result["seconds"], docs_examined=result["docs_examined"],
+                     keys_examined=result["keys_examined"], stages=result["stages"])
+    problems = [f"{result['name']}: {', '.join(result['problems'])} ({' > '.join(result['stages'])})"
+                for result in results if result["problems"]]
+    assert not problems, "Queries without a supporting index:\n" + "\n".join(problems)
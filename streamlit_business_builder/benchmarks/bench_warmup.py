@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import mongomock
+import pytest
+
+pytest.importorskip("httpx")
+
+from openai import OpenAI  # noqa: E402
+
+from utils.client_pool import ClientPool, http_client  # noqa: E402
+from utils.warmup import warm_up  # noqa: E402
+
+# Stand-in for the DNS lookup and TLS handshake of a new connection to the LLM endpoint
+HANDSHAKE_SECONDS = 0.2
+RESPONSE_SECONDS = 0.02
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Answers OpenAI model listings and chat completions, slowly on new connections"""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        time.sleep(HANDSHAKE_SECONDS)
+
+    def _reply(self, body):
+        time.sleep(RESPONSE_SECONDS)
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._reply({"object": "list", "data": [{"id": "deepseek-chat", "object": "model", "created": 0,
+                                                 "owned_by": "stand-in"}]})
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._reply({"id": "stand-in", "object": "chat.completion", "created": 0, "model": "deepseek-chat",
+                     "choices": [{"index": 0, "finish_reason": "stop",
+                                  "message": {"role": "assistant", "content": "ok"}}],
+                     "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}})
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+
+
+def _first_calls(base_url, warm, parallel=4):
+    """Seconds until `parallel` concurrent first calls of a new client all returned"""
+    pool = ClientPool([("stand-in", "stand-in", OpenAI(api_key="stand-in", base_url=base_url,
+                                                        http_client=http_client()))])
+    if warm:
+        warm_up(lambda: [pool], mongomock.MongoClient, connections=parallel)
+
+    def call():
+        pool.call(lambda client: client.chat.completions.create(
+            model="deepseek-chat", messages=[{"role": "user", "content": "ping"}]))
+
+    threads = [threading.Thread(target=call) for _ in range(parallel)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def bench_first_request_latency(bench, stand_in):
+    """After the warm-up the parallel stage calls of the first report reuse open connections"""
+    cold = _first_calls(stand_in, warm=False)
+    warm = _first_calls(stand_in, warm=True)
+    bench.record("first calls[cold]", cold)
+    bench.record("first calls[warm]", warm)
+    assert warm < HANDSHAKE_SECONDS, f"First calls after warm-up took {warm:.3f}s, still paying for new connections"
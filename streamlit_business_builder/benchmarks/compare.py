@@ -0,0 +1,44 @@
+"""Compare two benchmark result files
+
+Usage:
+    python benchmarks/compare.py results/bench_<old>.json results/bench_<new>.json
+"""
+import json
+import sys
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return data, {(r["group"], r["name"]): r for r in data["results"]}
+
+
+def main(old_path, new_path, threshold=0.10):
+    old, old_results = load(old_path)
+    new, new_results = load(new_path)
+    print(f"{'benchmark':<50} {old['commit']:>12} {new['commit']:>12} {'change':>9}")
+    regressions = 0
+    for key in sorted(set(old_results) | set(new_results)):
+        name = f"{key[0]}::{key[1]}"
+        if key not in old_results or key not in new_results:
+            side = "new" if key not in old_results else "removed"
+            print(f"{name:<50} {'-':>12} {'-':>12} {side:>9}")
+            continue
+        before = old_results[key]["median"]
+        after = new_results[key]["median"]
+        change = (after - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<50} {before * 1000:>10.2f}ms {after * 1000:>10.2f}ms {change:>+8.1%}{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__)
+        sys.exit(2)
+    sys.exit(1 if main(sys.argv[1], sys.argv[2]) else 0)
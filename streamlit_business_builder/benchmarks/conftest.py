@@ -0,0 +1,155 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+# Benchmarks import the app modules the same way Streamlit does
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+from sample_outputs import make_stage_outputs  # noqa: E402
+
+_results = []
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=APP_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+class Bench:
+    """Times a callable over several rounds and records the result"""
+
+    def __init__(self, group):
+        self.group = group
+
+    def __call__(self, name, func, *args, rounds=5, warmup=1, **kwargs):
+        for _ in range(warmup):
+            func(*args, **kwargs)
+        timings = []
+        result = None
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            timings.append(time.perf_counter() - start)
+        _results.append({
+            "group": self.group,
+            "name": name,
+            "rounds": rounds,
+            "min": min(timings),
+            "max": max(timings),
+            "mean": statistics.mean(timings),
+            "median": statistics.median(timings),
+            "stdev": statistics.stdev(timings) if rounds > 1 else 0.0,
+        })
+        return result
+
+    def record(self, name, seconds, **details):
+        """Record a measurement taken outside of __call__"""
+        _results.append({"group": self.group, "name": name, "rounds": 1, "min": seconds, "max": seconds,
+                         "mean": seconds, "median": seconds, "stdev": 0.0, **details})
+
+
+@pytest.fixture
+def bench(request):
+    return Bench(request.module.__name__.replace("bench_", ""))
+
+
+@pytest.fixture(scope="session")
+def stage_outputs():
+    return make_stage_outputs()
+
+
+@pytest.fixture
+def bench_db(monkeypatch):
+    """Database against BENCH_MONGODB_URI (local mongod) or mongomock"""
+    import utils.database as database
+    import utils.migrations as migrations
+
+    uri = os.getenv("BENCH_MONGODB_URI")
+    if uri:
+        monkeypatch.setenv("MONGODB_URI", uri)
+    else:
+        mongomock = pytest.importorskip("mongomock")
+        monkeypatch.setattr(database, "MongoClient", mongomock.MongoClient)
+    monkeypatch.setenv("MONGODB_DB", "bench_business_builder")
+    monkeypatch.setattr(database, "_clients", {})
+    monkeypatch.setattr(database, "_indexed_databases", set())
+    monkeypatch.setattr(database, "_index_failures", {})
+    # Applied below, after the drop, rather than on a background thread
+    monkeypatch.setattr(migrations, "MIGRATE_ON_START", False)
+
+    db = database.Database()
+    db.client.drop_database("bench_business_builder")
+    db.setup_indexes()
+    migrations.migrate(db.db)
+    yield db
+    db.client.drop_database("bench_business_builder")
+
+
+class FakeLLMClient:
+    """Stands in for the OpenAI client and returns canned agent outputs"""
+
+    def __init__(self, outputs, latency=0.0):
+        self.outputs = outputs
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, temperature=None, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        system_prompt = messages[0]["content"]
+        if system_prompt.startswith("You are the Clarity Agent"):
+            content = self.outputs["clarity"]
+        elif system_prompt.startswith("You are the Niche Agent"):
+            content = self.outputs["niche"]
+        elif system_prompt.startswith("You are the Action Agent"):
+            content = self.outputs["action"]
+        else:
+            content = self.outputs["strategy"]
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content), finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=0, completion_tokens=0, total_tokens=0, prompt_cache_hit_tokens=0),
+        )
+
+
+@pytest.fixture
+def fake_llm(stage_outputs):
+    return FakeLLMClient(stage_outputs, latency=float(os.getenv("BENCH_LLM_LATENCY", "0")))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    if not _results:
+        return
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    commit = _git_commit()
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": _results,
+    }
+    path = os.path.join(RESULTS_DIR, f"bench_{timestamp}_{commit}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"\nBenchmark results written to {path}")
@@ -0,0 +1,59 @@
+"""Realistic long agent outputs used as benchmark input"""
+
+SAMPLE_IDEA = (
+    "A subscription service that delivers locally roasted coffee beans to small offices "
+    "in Amsterdam and Rotterdam, with a companion app for reordering, brewing guides and "
+    "usage-based billing. We want to start with 50 offices and grow to 500 within two years."
+)
+
+_BULLETS = [
+    "Identify **key decision makers** such as office managers and HR leads",
+    "Validate pricing with at least 20 pilot customers before scaling",
+    "Partner with 3-5 local roasters to secure supply and seasonal variety",
+    "Track churn, average order value and *net promoter score* monthly",
+    "Automate reorders based on historical consumption per employee",
+    "Use LinkedIn outreach and office-building events for lead generation",
+]
+
+_TODO_ITEMS = [
+    "Register the business with the Chamber of Commerce (High, week 1)",
+    "Open a business bank account and set up invoicing (High, week 1)",
+    "Sign supply agreements with two roasters (High, week 2)",
+    "Build the landing page and waitlist (Medium, week 2)",
+    "Run a 10-office pilot in Amsterdam Zuid (High, weeks 3-6)",
+    "Collect pilot feedback and adjust pricing tiers (Medium, week 7)",
+    "Launch LinkedIn outreach campaign to 200 office managers (Medium, week 8)",
+    "Hire a part-time delivery driver (Low, week 9)",
+]
+
+
+def make_agent_output(sections=15, bullets_per_section=6, paragraphs_per_section=2, todo_items=40):
+    """Build a markdown agent response shaped like real DeepSeek output"""
+    parts = []
+    for i in range(1, sections + 1):
+        parts.append(f"### {i}. Section {i}: Strategic Area {i}\n")
+        for p in range(paragraphs_per_section):
+            parts.append(
+                f"**Overview {p + 1}.** This part of the plan explains how the business should approach "
+                f"area {i}. It references the market research, the target segments and the operational "
+                f"constraints identified earlier. The recommendation balances cost, speed and risk, "
+                f"and it includes measurable targets for the first 90 days.\n"
+            )
+        for b in range(bullets_per_section):
+            parts.append(f"- {_BULLETS[b % len(_BULLETS)]} (item {i}.{b + 1})")
+        parts.append("\n---\n")
+    if todo_items:
+        parts.append("TO-DO:")
+        for t in range(todo_items):
+            parts.append(f"- {_TODO_ITEMS[t % len(_TODO_ITEMS)]} [#{t + 1}]")
+    return "\n".join(parts)
+
+
+def make_stage_outputs(scale=1):
+    """Outputs for the four agents, roughly matching the size of real reports"""
+    return {
+        "clarity": make_agent_output(sections=5 * scale, todo_items=0),
+        "niche": make_agent_output(sections=8 * scale, todo_items=0),
+        "action": make_agent_output(sections=10 * scale, todo_items=0),
+        "strategy": make_agent_output(sections=15 * scale, todo_items=40 * scale),
+    }
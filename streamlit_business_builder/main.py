@@ -1,47 +1,289 @@
+import contextvars
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
-from openai import OpenAI
+from bson import ObjectId
 from datetime import datetime
-from prompts import CLARITY_PROMPT, NICHE_PROMPT, ACTION_PROMPT, BUSINESS_STRATEGY_PROMPT
+from prompts import PROMPT_REGISTRY, PROMPT_VERSION, build_messages, continuation_messages
 from translations import UI_TRANSLATIONS
-from pdf_generator import create_pdf_report
 from utils.database import Database
+from utils.scheduler import get_scheduler
+from utils.report_writer import get_report_writer
+from utils.file_manager import get_file_manager
+from utils.tracing import span, traced
+from utils.profiler import RunProfiler
+from utils.model_router import ModelRouter
+from utils.client_pool import ClientPool, http_client, parse_list
+from utils.variants import BEST_OF_N_STAGES, variant_temperatures, score_output
 
-# Initialize OpenAI client with DeepSeek configuration
-client = OpenAI(
-    api_key=st.secrets["DEEPSEEK_API_KEY"],
-    base_url="https://api.deepseek.com"
-)
+logger = logging.getLogger(__name__)
+
+# OpenAI clients (and the SDK import) are created by the background warm-up or the
+# first agent call, so pages that never run an analysis don't wait for them
+_pools = {}
+_client_lock = threading.Lock()
+
+def get_client_pool(endpoint="deepseek"):
+    """Get the client pool for an endpoint in LLM_ENDPOINTS, creating it on first use"""
+    with _client_lock:
+        if endpoint not in _pools:
+            from openai import OpenAI
+
+            config = LLM_ENDPOINTS[endpoint]
+            keys = parse_list(st.secrets[config["api_key_secret"]])
+            base_urls = parse_list(st.secrets.get(config["base_urls_secret"], config["base_url"]))
+            # One client per key and base URL, each with its own connection pool
+            _pools[endpoint] = ClientPool([
+                (f"{endpoint}#{key_index}@{base_url}", key_index,
+                 OpenAI(api_key=key, base_url=base_url, http_client=http_client()))
+                for key_index, key in enumerate(keys)
+                for base_url in base_urls
+            ])
+        return _pools[endpoint]
 
 # Agent-specific temperature settings
 AGENT_TEMPERATURES = {
     "clarity": 0.7,    # More focused analysis, clear thinking
     "niche": 0.9,      # Balance between research and creative targeting
     "action": 1.0,     # Mix of practical steps and creative strategies
-    "strategy": 0.8    # Balanced business planning and innovation
+    "strategy": 0.8,   # Balanced business planning and innovation
+    "translate": 0.3   # Faithful translation of a stored output
 }
 
-def get_agent_response(prompt, user_input, agent_type, lang_code="en"):
-    st.write(f"🔄 {UI_TRANSLATIONS[lang_code]['processing']}")
-    try:
+# Output token budgets per agent, long outputs dominate report latency and PDF size
+AGENT_MAX_TOKENS = {
+    "clarity": 1500,
+    "niche": 3000,
+    "action": 3000,
+    "strategy": 4000,
+    "translate": 4000
+}
+
+# Follow-up calls allowed for an output that hit its budget, before it is cut off
+MAX_CONTINUATIONS = int(os.getenv("LLM_MAX_CONTINUATIONS", "1"))
+
+# OpenAI compatible endpoints. The API key secret may hold a list of keys and the
+# base URL secret a list of URLs, calls are balanced over every combination
+LLM_ENDPOINTS = {
+    "deepseek": {
+        "base_url": "https://api.deepseek.com",
+        "api_key_secret": "DEEPSEEK_API_KEY",
+        "base_urls_secret": "DEEPSEEK_BASE_URLS"
+    }
+}
+
+# Models the router can send calls to, higher tiers give better output at a higher latency
+MODEL_ROUTES = {
+    "deepseek-chat": {"endpoint": "deepseek", "model": "deepseek-chat", "tier": 2},
+    "deepseek-reasoner": {"endpoint": "deepseek", "model": "deepseek-reasoner", "tier": 3}
+}
+
+# Per agent: the minimum quality tier and the routes to consider, in order of preference.
+# Each call goes to the fastest healthy route, the others are fallbacks.
+AGENT_ROUTING = {
+    "clarity": {"min_tier": 1, "routes": ["deepseek-chat", "deepseek-reasoner"]},
+    "niche": {"min_tier": 2, "routes": ["deepseek-chat", "deepseek-reasoner"]},
+    "action": {"min_tier": 2, "routes": ["deepseek-chat", "deepseek-reasoner"]},
+    "strategy": {"min_tier": 2, "routes": ["deepseek-chat", "deepseek-reasoner"]},
+    # Translation needs no reasoning, keep it on the cheaper model
+    "translate": {"min_tier": 1, "routes": ["deepseek-chat"]}
+}
+
+# Stages translated when an earlier report is reused in the other language
+TRANSLATED_STAGES = ("clarity", "niche", "action", "strategy")
+LANGUAGE_NAMES = {"en": "English", "nl": "Dutch"}
+
+router = ModelRouter(MODEL_ROUTES, AGENT_ROUTING)
+
+def get_client_pools():
+    """Client pools of every endpoint the model routes use"""
+    return [get_client_pool(endpoint) for endpoint in sorted({route["endpoint"] for route in MODEL_ROUTES.values()})]
+
+def response_usage(responses):
+    """Token usage of completions, including the prompt tokens served from the provider's context cache"""
+    totals = {}
+    for response in responses:
+        usage = getattr(response, "usage", None)
+        if not usage:
+            continue
+        cache_hit = getattr(usage, "prompt_cache_hit_tokens", None)
+        if cache_hit is None:
+            # OpenAI style usage reports cached tokens in the prompt token details
+            details = getattr(usage, "prompt_tokens_details", None)
+            cache_hit = getattr(details, "cached_tokens", 0) or 0
+        totals["prompt_tokens"] = totals.get("prompt_tokens", 0) + usage.prompt_tokens
+        totals["completion_tokens"] = totals.get("completion_tokens", 0) + usage.completion_tokens
+        totals["cache_hit_tokens"] = totals.get("cache_hit_tokens", 0) + cache_hit
+    return totals
+
+def cut_off(text, lang_code="en"):
+    """End an output that ran out of budget at its last complete line"""
+    last_line_end = text.rfind("\n")
+    if last_line_end > len(text) // 2:
+        text = text[:last_line_end]
+    return f"{text.rstrip()}\n\n*{UI_TRANSLATIONS[lang_code]['output_truncated']}*"
+
+def complete_within_budget(route, agent_type, user_content, lang_code="en", temperature=None):
+    """
+    Call the model with the agent's token budget, continuing an output that hits it
+    up to MAX_CONTINUATIONS times and cutting it off after that
+    Returns: (content, responses, continuations, budget_hit)
+    """
+    if temperature is None:
+        temperature = AGENT_TEMPERATURES[agent_type]
+    # Continuations go to the same client as the call they continue
+    return get_client_pool(route["endpoint"]).call(
+        lambda client: _complete(client, route, agent_type, user_content, lang_code, temperature)
+    )
+
+def _complete(client, route, agent_type, user_content, lang_code, temperature):
+    messages = build_messages(agent_type, user_content)
+    content = ""
+    responses = []
+    for continuation in range(MAX_CONTINUATIONS + 1):
         response = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": user_input},
-            ],
-            temperature=AGENT_TEMPERATURES[agent_type],
+            model=route["model"],
+            messages=messages,
+            temperature=temperature,
+            max_tokens=AGENT_MAX_TOKENS[agent_type],
             stream=False
         )
+        responses.append(response)
+        choice = response.choices[0]
+        content += choice.message.content
+        if choice.finish_reason != "length":
+            return content, responses, continuation, continuation > 0
+        messages = continuation_messages(messages, choice.message.content)
+    logger.warning(f"{agent_type} agent output cut off after {MAX_CONTINUATIONS} continuations")
+    return cut_off(content, lang_code), responses, MAX_CONTINUATIONS, True
+
+def call_agent(user_content, agent_type, lang_code, username, weight, call_span, temperature=None, on_position=None):
+    """
+    One agent call: wait for a scheduler slot, then call the best route
+    Returns: (content, usage)
+    """
+    queued_at = time.perf_counter()
+    # Wait for a free slot so concurrent sessions share the provider rate limit fairly
+    scheduler = get_scheduler(get_client_pool().key_count)
+    with scheduler.slot(username, weight, on_position=on_position):
+        call_span.set_attribute("queue_wait_ms", (time.perf_counter() - queued_at) * 1000)
+        route, (content, responses, continuations, budget_hit) = router.call(
+            agent_type, lambda route: complete_within_budget(route, agent_type, user_content, lang_code, temperature)
+        )
+    usage = {
+        "route": route,
+        "continuations": continuations,
+        "budget_hit": budget_hit,
+        **response_usage(responses)
+    }
+    return content, usage
+
+def best_of_n(user_content, agent_type, lang_code, username, weight, count):
+    """
+    Generate `count` variants of a stage at the same time, with temperatures spread around
+    the agent's own, and keep the one score_output rates best. Each variant takes its own
+    scheduler slot, so the stage takes about as long as one call while slots are free.
+    Returns: (content, usage) where the token counts cover every variant
+    """
+    prompt = PROMPT_REGISTRY[PROMPT_VERSION][agent_type]
+
+    def generate(temperature):
+        with span("agent_variant", agent_type=agent_type, temperature=temperature) as variant_span:
+            content, usage = call_agent(user_content, agent_type, lang_code, username, weight, variant_span, temperature)
+            # About half the token budget, at roughly four characters a token
+            score, details = score_output(content, prompt, usage["budget_hit"], require_todo=agent_type == "strategy",
+                                          target_chars=AGENT_MAX_TOKENS[agent_type] * 2)
+            variant_span.set_attribute("score", score)
+            return {"content": content, "usage": usage, "temperature": temperature, "score": score, **details}
+
+    with ThreadPoolExecutor(max_workers=count, thread_name_prefix=f"variant-{agent_type}") as executor:
+        # Each variant keeps the trace of the stage it belongs to
+        futures = [executor.submit(contextvars.copy_context().run, generate, temperature)
+                   for temperature in variant_temperatures(AGENT_TEMPERATURES[agent_type], count)]
+        variants, errors = [], []
+        for future in futures:
+            try:
+                variants.append(future.result())
+            except Exception as e:
+                logger.warning(f"{agent_type} variant failed: {e}")
+                errors.append(e)
+    if not variants:
+        raise errors[0]
+
+    best = max(variants, key=lambda variant: variant["score"])
+    usage = dict(best["usage"])
+    for key in ("prompt_tokens", "completion_tokens", "cache_hit_tokens"):
+        if key in usage:
+            usage[key] = sum(variant["usage"].get(key, 0) for variant in variants)
+            # Cost of the variants that were thrown away
+            usage[f"extra_{key}"] = usage[key] - best["usage"][key]
+    usage["variants"] = len(variants)
+    usage["failed_variants"] = len(errors)
+    usage["temperature"] = best["temperature"]
+    usage["variant_scores"] = [variant["score"] for variant in variants]
+    logger.info(f"{agent_type} agent picked the variant at temperature {best['temperature']} "
+                f"(scores {usage['variant_scores']}, {best['coverage']:.0%} section coverage)")
+    return best["content"], usage
+
+def get_agent_response(user_content, agent_type, lang_code="en", username="User", weight=1, stage_usage=None, variants=1, tracker=None):
+    st.write(f"🔄 {UI_TRANSLATIONS[lang_code]['processing']}")
+    queue_placeholder = st.empty()
+    queued = False
+
+    def show_queue_position(position):
+        nonlocal queued
+        queued = True
+        queue_placeholder.write(f"⏳ {UI_TRANSLATIONS[lang_code]['queue_position'].format(position=position)}")
+        # Runs in the background have no page to write to, the run status carries the position instead
+        if tracker:
+            tracker.queue_position(position)
+
+    try:
+        with span("get_agent_response", agent_type=agent_type) as agent_span:
+            if variants > 1 and agent_type in BEST_OF_N_STAGES:
+                content, usage = best_of_n(user_content, agent_type, lang_code, username, weight, variants)
+            else:
+                content, usage = call_agent(user_content, agent_type, lang_code, username, weight, agent_span,
+                                            on_position=show_queue_position)
+            queue_placeholder.empty()
+            if tracker and queued:
+                tracker.queue_position(None)
+            for key, value in usage.items():
+                agent_span.set_attribute(key, value)
+        if "prompt_tokens" in usage:
+            logger.info(f"{agent_type} agent on {usage['route']} used {usage['prompt_tokens']} prompt tokens, {usage['cache_hit_tokens']} from cache")
+        if stage_usage is not None:
+            stage_usage[agent_type] = usage
         st.write(f"✅ {UI_TRANSLATIONS[lang_code]['success']}")
-        return response.choices[0].message.content
+        return content
     except Exception as e:
         st.write(f"❌ {UI_TRANSLATIONS[lang_code]['error_occurred']}: {str(e)}")
         raise e
 
-def save_business_analysis(user_input, clarity_response, niche_response, action_response, final_response, language="en", username="User"):
-    """Save business analysis to files and MongoDB"""
+@traced("save_business_analysis")
+def save_business_analysis(user_input, clarity_response, niche_response, action_response, final_response, language="en", username="User", stage_timings=None, profiler=None, stage_usage=None, idea_id=None, persist=True, output_dir=None, report_builder=None, wait_saved=False):
+    """
+    Save business analysis to files and, unless persist is off, MongoDB.
+    Without output_dir the reports go to the artifact store, which evicts them by size and age,
+    instead of the working directory.
+    A ReportBuilder that already holds the stage sections only needs the final layout.
+    With wait_saved the MongoDB save happens before returning instead of in the background.
+    Returns: (txt, pdf) file paths in output_dir, or their digests in the artifact store
+    """
+    # ReportLab is only needed once a report is rendered
+    from pdf_generator import create_pdf_report
+
+    idea_id = idea_id or str(ObjectId())
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename_base = f"business_analysis_{timestamp}"
+    # Suffix keeps reports of concurrent sessions from overwriting each other
+    filename_base = f"business_analysis_{timestamp}_{idea_id[-6:]}"
+    if output_dir:
+        filename_base = os.path.join(output_dir, filename_base)
     
     # Generate TXT content
     txt_content = f"=== Business Analysis ===\n\n"
@@ -56,100 +298,271 @@ def save_business_analysis(user_input, clarity_response, niche_response, action_
     txt_content += f"{UI_TRANSLATIONS[language]['business_strategy']}\n"
     txt_content += final_response
     
-    # Save TXT file
-    txt_filename = f"{filename_base}.txt"
-    with open(txt_filename, "w", encoding="utf-8") as f:
-        f.write(txt_content)
-    
-    # Generate PDF report
-    pdf_filename = create_pdf_report(
-        filename_base,
-        user_input,
-        clarity_response,
-        niche_response,
-        action_response,
-        final_response,
-        language,
-        username
-    )
+    def build_pdf(filename_base):
+        if report_builder:
+            return report_builder.build(filename_base)
+        return create_pdf_report(
+            filename_base,
+            user_input,
+            clarity_response,
+            niche_response,
+            action_response,
+            final_response,
+            language,
+            username
+        )
+
+    pdf_data = None
+    if output_dir:
+        # Save TXT file
+        txt_filename = f"{filename_base}.txt"
+        with open(txt_filename, "w", encoding="utf-8") as f:
+            f.write(txt_content)
+        pdf_filename = build_pdf(filename_base)
+    else:
+        # ReportLab writes to a file, which is gone once its bytes are in the store
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(build_pdf(os.path.join(tmp_dir, filename_base)), "rb") as f:
+                pdf_data = f.read()
+        file_manager = get_file_manager()
+        txt_filename, pdf_filename = file_manager.put(txt_content), file_manager.put(pdf_data)
+    # The profile covers the agent calls and the PDF rendering, not the save itself
+    profile = profiler.stop() if profiler else None
+    if not persist:
+        return txt_filename, pdf_filename
     
-    # Save to MongoDB
+    # Save to MongoDB in the background, the report can be downloaded right away.
+    # Batches wait for the save, a row is only recorded as done once its report is stored
     try:
-        db = Database()
-        with open(pdf_filename, "rb") as pdf_file:
-            pdf_data = pdf_file.read()
-        
-        db.save_business_idea(
-            username=username,
-            idea_text=user_input,
-            pdf_data=pdf_data,
-            txt_data=txt_content,
-            language=language
-        )
-        st.success(UI_TRANSLATIONS[language]["report_saved"])
+        writer = get_report_writer(Database)
+        save = writer.save if wait_saved else writer.submit
+        save({
+            "idea_id": idea_id,
+            "username": username,
+            "idea_text": user_input,
+            # The idea's artifact digests are computed from these, so they match the store
+            **({"pdf_data": pdf_data} if pdf_data is not None else {"pdf_path": os.path.abspath(pdf_filename)}),
+            "txt_data": txt_content,
+            "language": language,
+            "stage_outputs": {
+                "clarity": clarity_response,
+                "niche": niche_response,
+                "action": action_response,
+                "strategy": final_response
+            },
+            "stage_timings": stage_timings,
+            "stage_usage": stage_usage,
+            "prompt_version": PROMPT_VERSION,
+            "profile": profile
+        })
+        st.info(UI_TRANSLATIONS[language]["report_saving"])
     except Exception as e:
+        if wait_saved:
+            # The caller only counts the report as done once it is stored
+            raise
         st.error(f"{UI_TRANSLATIONS[language]['error_saving_report']}: {str(e)}")
     
     return txt_filename, pdf_filename
 
-def run_business_builder(user_input, lang_code, username="User"):
+@traced("run_business_builder")
+def run_business_builder(user_input, lang_code, username="User", weight=1, reuse_stages=None, profile=False, tracker=None, idea_id=None, persist=True, output_dir=None, variants=1, wait_saved=False):
     """
     Run the business builder analysis
     Args:
         user_input: The business idea text
         lang_code: Language code (en/nl)
         username: Username for saving the report
+        weight: Scheduling weight of the user's LLM calls
+        reuse_stages: Stage outputs of a near-duplicate idea to reuse instead of calling the agent
+        profile: Store a cProfile and tracemalloc report of this run with the report
+        tracker: RunTracker that persists progress, so a reloaded page can reattach to the run
+        idea_id: Id to save the report under, generated when not given
+        persist: Save the report to MongoDB
+        output_dir: Directory for the report files, the artifact store when not given
+        variants: Variants generated of the BEST_OF_N_STAGES stages, the best one is kept
+        wait_saved: Return only once the report is saved to MongoDB or spooled to disk
     """
-    st.write(f"\n🚀 {UI_TRANSLATIONS[lang_code]['processing']}")
+    reuse_stages = reuse_stages or {}
+    stage_timings = {}
+    stage_usage = {}
+    profiler = RunProfiler().start() if profile else None
+    try:
+        # The PDF's front matter is prepared up front and its sections as their stage finishes
+        from pdf_generator import ReportBuilder
+        report_builder = ReportBuilder(user_input, lang_code, username)
+        st.write(f"\n🚀 {UI_TRANSLATIONS[lang_code]['processing']}")
     
-    # Run Clarity Agent
-    st.write(f"\n1️⃣ {UI_TRANSLATIONS[lang_code]['clarity_analysis']}...")
-    clarity_response = get_agent_response(CLARITY_PROMPT, user_input, "clarity", lang_code)
-    st.write(f"\n=== {UI_TRANSLATIONS[lang_code]['clarity_analysis']} ===")
-    st.write(clarity_response)
-
-    # Run Niche Agent
-    st.write(f"\n2️⃣ {UI_TRANSLATIONS[lang_code]['niche_strategy']}...")
-    niche_response = get_agent_response(
-        NICHE_PROMPT, 
-        f"{user_input}\n\n{UI_TRANSLATIONS[lang_code]['clarity_analysis']}: {clarity_response}", 
-        "niche",
-        lang_code
-    )
-    st.write(f"\n=== {UI_TRANSLATIONS[lang_code]['niche_strategy']} ===")
-    st.write(niche_response)
-
-    # Run Action Agent
-    st.write(f"\n3️⃣ {UI_TRANSLATIONS[lang_code]['action_plan']}...")
-    action_response = get_agent_response(
-        ACTION_PROMPT, 
-        f"{user_input}\n\n{UI_TRANSLATIONS[lang_code]['clarity_analysis']}: {clarity_response}\n{UI_TRANSLATIONS[lang_code]['niche_strategy']}: {niche_response}",
-        "action",
-        lang_code
-    )
-    st.write(f"\n=== {UI_TRANSLATIONS[lang_code]['action_plan']} ===")
-    st.write(action_response)
-
-    # Run Business Strategy Agent
-    st.write(f"\n4️⃣ {UI_TRANSLATIONS[lang_code]['business_strategy']}...")
-    final_response = get_agent_response(
-        BUSINESS_STRATEGY_PROMPT, 
-        f"{user_input}\n\n{UI_TRANSLATIONS[lang_code]['clarity_analysis']}: {clarity_response}\n{UI_TRANSLATIONS[lang_code]['niche_strategy']}: {niche_response}\n{UI_TRANSLATIONS[lang_code]['action_plan']}: {action_response}",
-        "strategy",
-        lang_code
-    )
-    st.write(f"\n=== {UI_TRANSLATIONS[lang_code]['business_strategy']} ===")
-    st.write(final_response)
+        # Run Clarity Agent
+        st.write(f"\n1️⃣ {UI_TRANSLATIONS[lang_code]['clarity_analysis']}...")
+        if tracker:
+            tracker.stage("clarity")
+        if "clarity" in reuse_stages:
+            st.write(f"♻️ {UI_TRANSLATIONS[lang_code]['stage_reused']}")
+            clarity_response = reuse_stages["clarity"]
+        else:
+            started = time.perf_counter()
+            clarity_response = get_agent_response(user_input, "clarity", lang_code, username, weight, stage_usage, variants,
+                                                  tracker)
+            stage_timings["clarity"] = time.perf_counter() - started
+        st.write(f"\n=== {UI_TRANSLATIONS[lang_code]['clarity_analysis']} ===")
+        st.write(clarity_response)
+        report_builder.add_stage("clarity", clarity_response)
+        if tracker:
+            tracker.stage_done("clarity", clarity_response)
+
+        # Run Niche Agent
+        st.write(f"\n2️⃣ {UI_TRANSLATIONS[lang_code]['niche_strategy']}...")
+        if tracker:
+            tracker.stage("niche")
+        if "niche" in reuse_stages:
+            st.write(f"♻️ {UI_TRANSLATIONS[lang_code]['stage_reused']}")
+            niche_response = reuse_stages["niche"]
+        else:
+            started = time.perf_counter()
+            niche_response = get_agent_response(
+                f"{user_input}\n\n{UI_TRANSLATIONS[lang_code]['clarity_analysis']}: {clarity_response}", 
+                "niche",
+                lang_code,
+                username,
+                weight,
+                stage_usage,
+                variants,
+                tracker
+            )
+            stage_timings["niche"] = time.perf_counter() - started
+        st.write(f"\n=== {UI_TRANSLATIONS[lang_code]['niche_strategy']} ===")
+        st.write(niche_response)
+        report_builder.add_stage("niche", niche_response)
+        if tracker:
+            tracker.stage_done("niche", niche_response)
+
+        # Run Action Agent
+        st.write(f"\n3️⃣ {UI_TRANSLATIONS[lang_code]['action_plan']}...")
+        if tracker:
+            tracker.stage("action")
+        started = time.perf_counter()
+        action_response = get_agent_response(
+            f"{user_input}\n\n{UI_TRANSLATIONS[lang_code]['clarity_analysis']}: {clarity_response}\n{UI_TRANSLATIONS[lang_code]['niche_strategy']}: {niche_response}",
+            "action",
+            lang_code,
+            username,
+            weight,
+            stage_usage,
+            variants,
+            tracker
+        )
+        stage_timings["action"] = time.perf_counter() - started
+        st.write(f"\n=== {UI_TRANSLATIONS[lang_code]['action_plan']} ===")
+        st.write(action_response)
+        report_builder.add_stage("action", action_response)
+        if tracker:
+            tracker.stage_done("action", action_response)
+
+        # Run Business Strategy Agent
+        st.write(f"\n4️⃣ {UI_TRANSLATIONS[lang_code]['business_strategy']}...")
+        if tracker:
+            tracker.stage("strategy")
+        started = time.perf_counter()
+        final_response = get_agent_response(
+            f"{user_input}\n\n{UI_TRANSLATIONS[lang_code]['clarity_analysis']}: {clarity_response}\n{UI_TRANSLATIONS[lang_code]['niche_strategy']}: {niche_response}\n{UI_TRANSLATIONS[lang_code]['action_plan']}: {action_response}",
+            "strategy",
+            lang_code,
+            username,
+            weight,
+            stage_usage,
+            variants,
+            tracker
+        )
+        stage_timings["strategy"] = time.perf_counter() - started
+        st.write(f"\n=== {UI_TRANSLATIONS[lang_code]['business_strategy']} ===")
+        st.write(final_response)
+        report_builder.add_stage("strategy", final_response)
+        if tracker:
+            tracker.stage_done("strategy", final_response)
+            tracker.stage("report")
+    
+        # Save the analysis to files and MongoDB
+        txt_filename, pdf_filename = save_business_analysis(
+            user_input,
+            clarity_response,
+            niche_response,
+            action_response,
+            final_response,
+            lang_code,
+            username,
+            stage_timings,
+            profiler,
+            stage_usage,
+            idea_id,
+            persist,
+            output_dir,
+            report_builder,
+            wait_saved
+        )
     
-    # Save the analysis to files and MongoDB
-    txt_filename, pdf_filename = save_business_analysis(
+        return txt_filename, pdf_filename 
+    finally:
+        # save_business_analysis stops it with the report, a failed stage must not leave
+        # cProfile and the process wide tracemalloc running in a long lived worker thread
+        if profiler:
+            profiler.stop()
+
+def translate_output(text, lang_code, username="User", weight=1):
+    """
+    Translate an agent output into lang_code with a single call, reusing a cached translation
+    Returns: (translation, usage)
+    """
+    key = hashlib.sha256(f"{PROMPT_VERSION}\n{lang_code}\n{text}".encode("utf-8")).hexdigest()
+    db = Database()
+    cached = db.get_cached_translation(key)
+    if cached is not None:
+        return cached, {"cached": True}
+    with span("translate_output", lang_code=lang_code) as translate_span:
+        translation, usage = call_agent(
+            f"{LANGUAGE_NAMES[lang_code]}\n{text}", "translate", lang_code, username, weight, translate_span
+        )
+    db.cache_translation(key, lang_code, translation)
+    return translation, usage
+
+@traced("translate_business_analysis")
+def translate_business_analysis(user_input, source_idea, lang_code, username="User", weight=1, tracker=None, idea_id=None):
+    """
+    Produce the report of an earlier analysis in the other language: one translation call per
+    stage, all at the same time, instead of running the four agents again
+    Args:
+        user_input: The business idea text
+        source_idea: Earlier idea with the stage outputs to translate
+        lang_code: Language code of the new report (en/nl)
+    """
+    stage_usage = {}
+    st.write(f"\n🌐 {UI_TRANSLATIONS[lang_code]['translating_report']}")
+    if tracker:
+        tracker.stage("translate")
+
+    source_stages = source_idea["stage_outputs"]
+    with ThreadPoolExecutor(max_workers=len(TRANSLATED_STAGES), thread_name_prefix="translate") as executor:
+        futures = {
+            stage: executor.submit(contextvars.copy_context().run, translate_output, source_stages[stage], lang_code, username, weight)
+            for stage in TRANSLATED_STAGES
+        }
+        translations = {}
+        for stage, future in futures.items():
+            translations[stage], usage = future.result()
+            stage_usage[stage] = {**usage, "translated_from": source_idea["idea_id"]}
+            if tracker:
+                tracker.stage_done(stage, translations[stage])
+    if tracker:
+        tracker.stage("report")
+
+    # The report is rebuilt from the translated sections with the target language's PDF texts
+    return save_business_analysis(
         user_input,
-        clarity_response,
-        niche_response,
-        action_response,
-        final_response,
+        translations["clarity"],
+        translations["niche"],
+        translations["action"],
+        translations["strategy"],
         lang_code,
-        username
+        username,
+        stage_usage=stage_usage,
+        idea_id=idea_id
     )
-    
-    return txt_filename, pdf_filename 
\ No newline at end of file
@@ -1,7 +1,19 @@
+import math
 import streamlit as st
 from utils.database import Database
+from utils.bulk_users import parse_rows, import_users, iter_user_export
+from utils.scheduler import DEFAULT_PLAN, PLANS
 from translations import UI_TRANSLATIONS
 
+USERS_PER_PAGE = 25
+
+# Sortable user fields and their label keys
+SORT_FIELDS = {
+    "created_at": "created_at",
+    "last_login": "last_login",
+    "credits": "credits_label"
+}
+
 # Configure the page layout
 st.set_page_config(layout="wide", initial_sidebar_state="expanded")
 
@@ -95,50 +107,135 @@ def user_management():
             new_name = st.text_input(texts["name_label"])
             new_email = st.text_input(texts["email_label"])
             new_credits = st.number_input(texts["initial_credits"], min_value=0, value=3)
+            new_plan = st.selectbox(texts["plan_label"], PLANS, index=PLANS.index(DEFAULT_PLAN))
             new_is_admin = st.checkbox(texts["is_admin"])
             
             if st.form_submit_button(texts["add_user_button"]):
                 if new_username and new_password and new_name and new_email:
-                    db.create_user(new_username, new_password, new_email, new_name, new_credits, new_is_admin)
+                    db.create_user(new_username, new_password, new_email, new_name, new_credits, new_is_admin, new_plan)
                     st.success(texts["user_added"])
                     st.rerun()
                 else:
                     st.error(texts["all_fields_required"])
+
+        with st.expander(texts["bulk_import"]):
+            uploaded = st.file_uploader(texts["bulk_import_file"], type=["csv", "jsonl"])
+            if uploaded and st.button(texts["bulk_import_button"]):
+                with st.spinner(texts["bulk_importing"]):
+                    rows = parse_rows(uploaded.getvalue(), uploaded.name)
+                    inserted, errors = import_users(db, rows)
+                st.success(texts["bulk_import_result"].format(inserted=inserted, total=len(rows)))
+                if errors:
+                    st.dataframe(
+                        [{texts["row_label"]: number, texts["error_label"]: message} for number, message in errors],
+                        hide_index=True
+                    )
+
+        with st.expander(texts["export_users"]):
+            export_format = st.radio(texts["select_format"], ["CSV", "JSONL"], horizontal=True)
+            # Built when clicked, on a thread of its own instead of on every rerun of the page
+            st.download_button(
+                texts["download_export"],
+                data=lambda: "".join(iter_user_export(db, export_format.lower())),
+                file_name=f"users.{export_format.lower()}",
+                mime="text/csv" if export_format == "CSV" else "application/jsonl"
+            )
     
     # User list and management in the second column
     with col2:
         st.header(texts["user_list"])
-        users = db.list_users()
-        
-        for user in users:
-            with st.expander(f"{user['name']} ({user['username']})"):
-                with st.form(f"edit_user_{user['username']}", clear_on_submit=False):
-                    name = st.text_input(texts["name_label"], value=user['name'])
-                    email = st.text_input(texts["email_label"], value=user.get('email', ''))
-                    credits = st.number_input(texts["credits_label"], value=user['credits'])
-                    is_admin = st.checkbox(texts["admin_label"], value=user.get('is_admin', False))
-                    
-                    # Use full width for buttons on mobile
-                    save_col, delete_col = st.columns(2)
-                    with save_col:
-                        if st.form_submit_button(texts["save_changes"], use_container_width=True):
-                            updates = {
-                                "name": name,
-                                "email": email,
-                                "credits": credits,
-                                "is_admin": is_admin
-                            }
-                            db.update_user(user['username'], updates)
-                            st.success(texts["user_updated"])
+
+        search_col, sort_col, order_col = st.columns([2, 1, 1])
+        with search_col:
+            query = st.text_input(texts["search_users"], key="user_search")
+        with sort_col:
+            sort_by = st.selectbox(
+                texts["sort_by"],
+                list(SORT_FIELDS),
+                format_func=lambda field: texts[SORT_FIELDS[field]]
+            )
+        with order_col:
+            descending = st.radio(texts["sort_order"], [True, False], horizontal=True,
+                                  format_func=lambda desc: "↓" if desc else "↑")
+
+        # Start at the first page whenever the search changes
+        search_key = (query, sort_by, descending)
+        if st.session_state.get("user_search_key") != search_key:
+            st.session_state["user_search_key"] = search_key
+            st.session_state["user_page"] = 0
+        page = st.session_state.get("user_page", 0)
+
+        users, total = db.search_users(query, sort_by, descending, page, USERS_PER_PAGE)
+        page_count = max(1, math.ceil(total / USERS_PER_PAGE))
+
+        st.dataframe(
+            [
+                {
+                    texts["username_label"]: user["username"],
+                    texts["name_label"]: user.get("name", ""),
+                    texts["email_label"]: user.get("email", ""),
+                    texts["credits_label"]: user.get("credits", 0),
+                    texts["plan_label"]: user.get("plan", DEFAULT_PLAN),
+                    texts["admin_label"]: user.get("is_admin", False),
+                    texts["last_login"]: user.get("last_login")
+                }
+                for user in users
+            ],
+            use_container_width=True,
+            hide_index=True
+        )
+
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            if st.button(texts["previous_page"], disabled=page == 0, use_container_width=True):
+                st.session_state["user_page"] = page - 1
+                st.rerun()
+        with page_col:
+            st.write(texts["page_of"].format(page=page + 1, pages=page_count, total=total))
+        with next_col:
+            if st.button(texts["next_page"], disabled=page + 1 >= page_count, use_container_width=True):
+                st.session_state["user_page"] = page + 1
+                st.rerun()
+
+        # Only the selected user gets an edit form
+        selected = st.selectbox(
+            texts["edit_user"],
+            [None] + users,
+            format_func=lambda user: "—" if user is None else f"{user['name']} ({user['username']})"
+        )
+        if selected:
+            user = selected
+            with st.form(f"edit_user_{user['username']}", clear_on_submit=False):
+                name = st.text_input(texts["name_label"], value=user['name'])
+                email = st.text_input(texts["email_label"], value=user.get('email', ''))
+                credits = st.number_input(texts["credits_label"], value=user['credits'])
+                current_plan = user.get('plan', DEFAULT_PLAN)
+                plan = st.selectbox(texts["plan_label"], PLANS,
+                                    index=PLANS.index(current_plan) if current_plan in PLANS else 0)
+                is_admin = st.checkbox(texts["admin_label"], value=user.get('is_admin', False))
+                confirm_delete = st.checkbox(texts["confirm_delete"])
+                
+                # Use full width for buttons on mobile
+                save_col, delete_col = st.columns(2)
+                with save_col:
+                    if st.form_submit_button(texts["save_changes"], use_container_width=True):
+                        updates = {
+                            "name": name,
+                            "email": email,
+                            "credits": credits,
+                            "plan": plan,
+                            "is_admin": is_admin
+                        }
+                        db.update_user(user['username'], updates)
+                        st.success(texts["user_updated"])
+                        st.rerun()
+                
+                with delete_col:
+                    if st.form_submit_button(texts["delete_user"], use_container_width=True):
+                        if st.session_state["username"] != user["username"] and confirm_delete:
+                            db.delete_user(user['username'])
+                            st.success(texts["user_deleted"])
                             st.rerun()
-                    
-                    with delete_col:
-                        if st.form_submit_button(texts["delete_user"], use_container_width=True):
-                            if st.session_state["username"] != user["username"]:
-                                if st.button(texts["confirm_delete"]):
-                                    db.delete_user(user['username'])
-                                    st.success(texts["user_deleted"])
-                                    st.rerun()
 
 if __name__ == "__main__":
     user_management() 
\ No newline at end of file
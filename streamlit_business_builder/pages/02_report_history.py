@@ -1,5 +1,7 @@
+import asyncio
 import streamlit as st
-from utils.database import Database
+from utils.async_database import run_async
+from utils.file_manager import get_file_manager
 from translations import UI_TRANSLATIONS
 import io
 import zipfile
@@ -8,28 +10,48 @@ from datetime import datetime
 # Configure the page layout
 st.set_page_config(layout="wide", initial_sidebar_state="expanded")
 
+# Report field of each kind of download
+REPORT_FIELDS = {"pdf": "pdf_report", "txt": "txt_report", "profile": "profile"}
+
 def format_datetime(dt):
     """Format datetime for display"""
     return dt.strftime("%Y-%m-%d %H:%M")
 
-def create_zip_file(reports, selected_format="pdf"):
-    """Create a zip file containing selected reports"""
+async def create_zip_file(db, idea_ids, selected_format="pdf"):
+    """Create a zip file containing selected reports, reading blobs while earlier ones are compressed"""
     zip_buffer = io.BytesIO()
     with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for report in reports:
+        async for report in db.iter_reports(idea_ids):
             if selected_format == "pdf":
                 data = report["pdf_report"]
                 ext = "pdf"
             else:
                 data = report["txt_report"]
                 ext = "txt"
+            if data is None:
+                # No report of this format, leave it out rather than add an empty file
+                continue
             
             # Create filename using idea_id and timestamp
             filename = f"report_{report['idea_id']}.{ext}"
-            zip_file.writestr(filename, data)
+            await asyncio.to_thread(zip_file.writestr, filename, data)
     
     return zip_buffer.getvalue()
 
+def report_download(idea, kind):
+    """
+    Deferred download data of one report: the blob is only read when the button is clicked,
+    from the artifact store or else from MongoDB, so listed reports take no session memory
+    """
+    digest = (idea.get("artifacts") or {}).get(kind)
+    idea_id = idea["idea_id"]
+
+    def load():
+        reports = run_async(lambda db: db.get_idea_reports(idea_id))
+        return reports and reports.get(REPORT_FIELDS[kind])
+
+    return get_file_manager().deferred(digest, load)
+
 def report_history():
     """Report history page for viewing past business ideas and reports"""
     
@@ -45,11 +67,13 @@ def report_history():
 
     st.title(texts["report_history_title"])
     
-    # Initialize database connection
-    db = Database()
-    
     # Get user's role
     is_admin = st.session_state.get("is_admin", False)
+
+    # Both tabs list the same ideas, load them once. run_async runs on the event loop thread,
+    # which has no session state: read it here and pass plain values
+    username = st.session_state["username"]
+    ideas = run_async(lambda db: db.get_all_ideas() if is_admin else db.get_user_ideas(username))
     
     # Create tabs for different views
     if is_admin:
@@ -58,12 +82,9 @@ def report_history():
         tab1, tab2 = st.tabs([texts["my_reports"], texts["batch_download"]])
 
     with tab1:
-        # Get business ideas
         if is_admin:
-            ideas = db.get_all_ideas()
             st.subheader(texts["all_users_reports"])
         else:
-            ideas = db.get_user_ideas(st.session_state["username"])
             st.subheader(texts["your_reports"])
 
         # Display ideas in a table
@@ -75,42 +96,46 @@ def report_history():
                     st.write(f"**{texts['created_by']}:** {idea['username']}" if is_admin else "")
                     st.write(f"**{texts['created_at']}:** {format_datetime(idea['created_at'])}")
                     
-                    # Get reports for this idea
-                    reports = db.get_idea_reports(idea['idea_id'])
-                    if reports:
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if reports.get('pdf_report'):
-                                st.download_button(
-                                    texts["download_pdf"],
-                                    data=reports['pdf_report'],
-                                    file_name=f"report_{idea['idea_id']}.pdf",
-                                    mime="application/pdf"
-                                )
-                        with col2:
-                            if reports.get('txt_report'):
-                                st.download_button(
-                                    texts["download_txt"],
-                                    data=reports['txt_report'],
-                                    file_name=f"report_{idea['idea_id']}.txt",
-                                    mime="text/plain"
-                                )
+                    # Reports are only read when a download is clicked, and only offered when
+                    # the idea has a digest of them (migration 5 adds digests to older ideas)
+                    artifacts = idea.get('artifacts') or {}
+                    col1, col2 = st.columns(2)
+                    with col1:
+                        if artifacts.get('pdf'):
+                            st.download_button(
+                                texts["download_pdf"],
+                                data=report_download(idea, "pdf"),
+                                file_name=f"report_{idea['idea_id']}.pdf",
+                                mime="application/pdf",
+                                key=f"pdf_{idea['idea_id']}"
+                            )
+                    with col2:
+                        if artifacts.get('txt'):
+                            st.download_button(
+                                texts["download_txt"],
+                                data=report_download(idea, "txt"),
+                                file_name=f"report_{idea['idea_id']}.txt",
+                                mime="text/plain",
+                                key=f"txt_{idea['idea_id']}"
+                            )
+                    if is_admin and artifacts.get('profile'):
+                        st.download_button(
+                            texts["download_profile"],
+                            data=report_download(idea, "profile"),
+                            file_name=f"profile_{idea['idea_id']}.txt",
+                            mime="text/plain",
+                            key=f"profile_{idea['idea_id']}"
+                        )
         else:
             st.info(texts["no_reports"])
 
     with tab2:
         st.subheader(texts["batch_download_title"])
         
-        # Get ideas for batch download
-        if is_admin:
-            batch_ideas = db.get_all_ideas()
-        else:
-            batch_ideas = db.get_user_ideas(st.session_state["username"])
-
-        if batch_ideas:
+        if ideas:
             # Create selection interface
             selected_ideas = []
-            for idea in batch_ideas:
+            for idea in ideas:
                 if st.checkbox(
                     f"{format_datetime(idea['created_at'])} - {idea['idea_text'][:100]}...",
                     key=f"select_{idea['idea_id']}"
@@ -127,16 +152,14 @@ def report_history():
                         horizontal=True
                     )
                 
-                # Download button
-                reports = db.get_multiple_reports(selected_ideas)
-                if reports:
-                    zip_data = create_zip_file(reports, selected_format.lower())
-                    st.download_button(
-                        texts["download_selected"],
-                        data=zip_data,
-                        file_name=f"reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
-                        mime="application/zip"
-                    )
+                # Download button, the zip is only built when it is clicked
+                selected_format = selected_format.lower()
+                st.download_button(
+                    texts["download_selected"],
+                    data=lambda: run_async(lambda db: create_zip_file(db, selected_ideas, selected_format)),
+                    file_name=f"reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip",
+                    mime="application/zip"
+                )
         else:
             st.info(texts["no_reports"])
 
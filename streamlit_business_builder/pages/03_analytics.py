@@ -0,0 +1,79 @@
+import os
+import streamlit as st
+from datetime import datetime, timedelta
+from utils.database import Database
+from utils.analytics import (
+    refresh_summary, last_refreshed, load_summary, reports_per_day, reports_per_user,
+    reports_per_language, stage_latency, stage_latency_per_day, cache_hit_rate,
+    budget_hit_rate
+)
+from translations import UI_TRANSLATIONS
+
+# Configure the page layout
+st.set_page_config(layout="wide", initial_sidebar_state="expanded")
+
+# The summary is refreshed on page load when it is older than this
+ANALYTICS_REFRESH_SECONDS = int(os.getenv("ANALYTICS_REFRESH_SECONDS", "300"))
+
+def analytics():
+    """Usage analytics page for admin users"""
+    
+    # Get language code from session state or default to English
+    selected_language = st.session_state.get('selected_language', 'English')
+    lang_code = "nl" if selected_language == "Dutch" else "en"
+    texts = UI_TRANSLATIONS[lang_code]
+    
+    # Check if user is logged in and is admin
+    if not st.session_state.get("authentication_status"):
+        st.error(texts["login_required"])
+        st.stop()
+    elif not st.session_state.get("is_admin"):
+        st.error(texts["unauthorized"])
+        st.stop()
+
+    st.title(texts["analytics_title"])
+    
+    # Initialize database connection
+    db = Database()
+
+    refreshed_at = last_refreshed(db)
+    stale = not refreshed_at or datetime.utcnow() - refreshed_at > timedelta(seconds=ANALYTICS_REFRESH_SECONDS)
+    if st.button(texts["refresh_analytics"]) or stale:
+        refresh_summary(db)
+        refreshed_at = last_refreshed(db)
+    st.caption(f"{texts['analytics_refreshed_at']}: {refreshed_at.strftime('%Y-%m-%d %H:%M:%S')} UTC")
+
+    days = st.selectbox(texts["analytics_period"], [7, 30, 90, 365], index=2)
+    df = load_summary(db, days)
+    if df.empty:
+        st.info(texts["no_reports"])
+        return
+
+    total_col, users_col, avg_col = st.columns(3)
+    total_col.metric(texts["total_reports"], int(df["reports"].sum()))
+    users_col.metric(texts["active_users"], df["username"].nunique())
+    avg_col.metric(texts["avg_report_seconds"], f"{stage_latency(df).sum():.0f}")
+
+    st.subheader(texts["reports_per_day"])
+    st.line_chart(reports_per_day(df))
+
+    user_col, language_col = st.columns(2)
+    with user_col:
+        st.subheader(texts["credits_per_user"])
+        st.bar_chart(reports_per_user(df))
+    with language_col:
+        st.subheader(texts["reports_per_language"])
+        st.bar_chart(reports_per_language(df))
+
+    st.subheader(texts["stage_latency"])
+    st.bar_chart(stage_latency(df))
+    st.line_chart(stage_latency_per_day(df))
+
+    st.subheader(texts["cache_hit_rate"])
+    st.bar_chart(cache_hit_rate(df))
+
+    st.subheader(texts["budget_hit_rate"])
+    st.bar_chart(budget_hit_rate(df))
+
+if __name__ == "__main__":
+    analytics()
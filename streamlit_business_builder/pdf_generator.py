@@ -9,6 +9,7 @@ from reportlab.lib.units import mm
 from datetime import datetime
 import os
 import re
+from utils.tracing import span, traced
 
 # PDF text translations
 PDF_TRANSLATIONS = {
@@ -122,6 +123,7 @@ def create_table_of_contents(elements, heading_style, texts, sections):
     
     elements.append(PageBreak())
 
+@traced("clean_text")
 def clean_text(text):
     # First, normalize line endings
     text = text.replace('\r\n', '\n').replace('\r', '\n')
@@ -199,24 +201,8 @@ def format_text_to_paragraphs(text):
     
     return formatted_paragraphs
 
-def create_pdf_report(filename_base, user_input, clarity_response, niche_response, action_response, final_response, language="en", username="User"):
-    """Create a professionally formatted PDF report"""
-    pdf_filename = f"{filename_base}.pdf"
-    
-    # Get translations
-    texts = PDF_TRANSLATIONS[language]
-    
-    # Document setup
-    doc = SimpleDocTemplate(
-        pdf_filename,
-        pagesize=letter,
-        rightMargin=72,
-        leftMargin=72,
-        topMargin=72,
-        bottomMargin=72
-    )
-
-    # Styles
+def create_report_styles():
+    """Paragraph styles of the report"""
     styles = getSampleStyleSheet()
     
     title_style = ParagraphStyle(
@@ -260,47 +246,94 @@ def create_pdf_report(filename_base, user_input, clarity_response, niche_respons
         spaceBefore=3,
         spaceAfter=3
     )
+    return {"title": title_style, "heading": heading_style, "body": body_style, "bullet": bullet_style}
 
-    # Build content
-    elements = []
-    
-    # Cover page and TOC
-    create_cover_page(elements, title_style, texts, username)
-    create_table_of_contents(elements, heading_style, texts, [(texts["initial_idea"], "1"), (texts["business_strategy"], "2")])
-    
-    # Initial Business Idea
-    elements.append(Paragraph(texts["initial_idea"], heading_style))
-    elements.append(Paragraph(clean_text(user_input), body_style))
-    elements.append(PageBreak())
-    
-    # Business Strategy
-    elements.append(Paragraph(texts["business_strategy"], heading_style))
-    strategy_text = final_response.split('TO-DO:')[0] if 'TO-DO:' in final_response else final_response
-    
-    # Process each paragraph of the strategy text
-    for para in clean_text(strategy_text).split('\n\n'):
-        if para.strip():
-            if para.strip().startswith('•'):
-                elements.append(Paragraph(para.strip(), bullet_style))
-            else:
-                elements.append(Paragraph(para.strip(), body_style))
-            elements.append(Spacer(1, 6))
-    
-    elements.append(PageBreak())
-    
-    # Action Items (TO-DO list)
-    if 'TO-DO:' in final_response:
-        elements.append(Paragraph(texts["todo_list"], heading_style))
-        todo_text = final_response.split('TO-DO:')[1].strip()
-        todo_items = [x.strip() for x in clean_text(todo_text).split('\n') if x.strip()]
+class ReportBuilder:
+    """
+    Builds the PDF report while the agents are still running: the cover page, table of
+    contents and initial idea are prepared up front and each section as soon as its
+    stage returns. The PDF only shows the strategy stage, which is the last one, so its
+    section and the layout are still left once the last agent is done.
+    """
+
+    def __init__(self, user_input, language="en", username="User"):
+        self.texts = PDF_TRANSLATIONS[language]
+        self.styles = create_report_styles()
+        self._sections = {}
+
+        # Cover page and TOC
+        self._front = []
+        create_cover_page(self._front, self.styles["title"], self.texts, username)
+        create_table_of_contents(self._front, self.styles["heading"], self.texts, [(self.texts["initial_idea"], "1"), (self.texts["business_strategy"], "2")])
         
-        for item in todo_items:
-            if item.startswith('•'):
-                item = item[1:].strip()
-            elements.append(Paragraph(f"• {item}", bullet_style))
-            elements.append(Spacer(1, 3))
+        # Initial Business Idea
+        self._front.append(Paragraph(self.texts["initial_idea"], self.styles["heading"]))
+        self._front.append(Paragraph(clean_text(user_input), self.styles["body"]))
+        self._front.append(PageBreak())
 
-    # Build PDF
-    doc.build(elements, canvasmaker=lambda *args, **kwargs: NumberedCanvas(*args, texts=texts, **kwargs))
-    
-    return pdf_filename 
\ No newline at end of file
+    def add_stage(self, stage, output):
+        """Prepare the flowables of a finished stage, the PDF only shows the strategy stage"""
+        if stage == "strategy":
+            self._sections[stage] = self._strategy_flowables(output)
+
+    def _strategy_flowables(self, final_response):
+        texts, styles = self.texts, self.styles
+        elements = []
+
+        # Business Strategy
+        elements.append(Paragraph(texts["business_strategy"], styles["heading"]))
+        strategy_text = final_response.split('TO-DO:')[0] if 'TO-DO:' in final_response else final_response
+        
+        # Process each paragraph of the strategy text
+        for para in clean_text(strategy_text).split('\n\n'):
+            if para.strip():
+                if para.strip().startswith('•'):
+                    elements.append(Paragraph(para.strip(), styles["bullet"]))
+                else:
+                    elements.append(Paragraph(para.strip(), styles["body"]))
+                elements.append(Spacer(1, 6))
+        
+        elements.append(PageBreak())
+        
+        # Action Items (TO-DO list)
+        if 'TO-DO:' in final_response:
+            elements.append(Paragraph(texts["todo_list"], styles["heading"]))
+            todo_text = final_response.split('TO-DO:')[1].strip()
+            todo_items = [x.strip() for x in clean_text(todo_text).split('\n') if x.strip()]
+            
+            for item in todo_items:
+                if item.startswith('•'):
+                    item = item[1:].strip()
+                elements.append(Paragraph(f"• {item}", styles["bullet"]))
+                elements.append(Spacer(1, 3))
+        return elements
+
+    @traced("report_builder.build")
+    def build(self, filename_base):
+        """Lay out the prepared flowables and write the PDF, returns its filename"""
+        pdf_filename = f"{filename_base}.pdf"
+        
+        # Document setup
+        doc = SimpleDocTemplate(
+            pdf_filename,
+            pagesize=letter,
+            rightMargin=72,
+            leftMargin=72,
+            topMargin=72,
+            bottomMargin=72
+        )
+
+        elements = self._front + self._sections.get("strategy", [])
+        texts = self.texts
+        with span("doc.build", flowables=len(elements)):
+            doc.build(elements, canvasmaker=lambda *args, **kwargs: NumberedCanvas(*args, texts=texts, **kwargs))
+        
+        return pdf_filename
+
+@traced("create_pdf_report")
+def create_pdf_report(filename_base, user_input, clarity_response, niche_response, action_response, final_response, language="en", username="User"):
+    """Create a professionally formatted PDF report"""
+    builder = ReportBuilder(user_input, language, username)
+    for stage, output in (("clarity", clarity_response), ("niche", niche_response), ("action", action_response), ("strategy", final_response)):
+        builder.add_stage(stage, output)
+    return builder.build(filename_base)
@@ -29,11 +29,7 @@ Please analyze the business idea and provide insights in the following format:
 - Next steps
 
 Important: If the input is in Dutch, respond in Dutch. If the input is in English, respond in English.
-Provide your analysis in a clear, concise manner that helps the entrepreneur understand both the potential and challenges of their business idea.
-
-Business Idea:
-{input_text}
-"""
+Provide your analysis in a clear, concise manner that helps the entrepreneur understand both the potential and challenges of their business idea."""
 
 NICHE_PROMPT = """You are the Niche Agent, a market research and targeting specialist. Building on the Clarity Agent's analysis, your role is to conduct deep market research and identify specific opportunities for business growth. You have the capability to analyze market data, identify key players, and find potential leads.
 
@@ -546,3 +542,52 @@ Important:
 - Provide context for each resource and contact
 - Ensure all links and resources are relevant to the business model
 - Include alternative contacts for key relationships"""
+
+# Bump when a prompt changes. The version is stored with every report, so cost
+# and quality can be compared per version.
+PROMPT_VERSION = "2"
+
+# Translates a stored agent output when a report is reused in the other language.
+# The target language is in the user message, so this prefix is cached for both languages
+TRANSLATE_PROMPT = """You are a professional translator of business plans and market analyses. Translate the text in the user message into the target language named on its first line.
+
+Important:
+- Translate everything after the first line, do not summarize, shorten or add anything
+- Keep the structure exactly: numbering, headings, bullet points, tables, links and markdown formatting
+- Keep the marker "TO-DO:" unchanged, it is read by the report generator
+- Keep names, company names, URLs, email addresses and figures unchanged
+- Use the business terms a native speaker would use
+- Reply with the translation only"""
+
+# Sent when an output stopped at the stage's token budget
+CONTINUE_PROMPT = "Continue exactly where your previous answer stopped, without repeating anything."
+
+PROMPT_REGISTRY = {
+    "2": {
+        "clarity": CLARITY_PROMPT,
+        "niche": NICHE_PROMPT,
+        "action": ACTION_PROMPT,
+        "strategy": BUSINESS_STRATEGY_PROMPT,
+        "translate": TRANSLATE_PROMPT
+    }
+}
+
+
+def build_messages(agent_type, user_content, version=PROMPT_VERSION):
+    """
+    Chat messages for an agent call. The system prompt comes first and is identical
+    for every run of the agent, so the provider can serve that prefix from its
+    context cache; everything that changes per run goes in the last message.
+    """
+    return [
+        {"role": "system", "content": PROMPT_REGISTRY[version][agent_type]},
+        {"role": "user", "content": user_content},
+    ]
+
+
+def continuation_messages(messages, partial_output):
+    """Messages asking the agent to continue an output that hit its token budget"""
+    return messages + [
+        {"role": "assistant", "content": partial_output},
+        {"role": "user", "content": CONTINUE_PROMPT},
+    ]
@@ -66,7 +66,62 @@ UI_TRANSLATIONS = {
         "select_format": "Select Format",
         "download_selected": "Download Selected Reports",
         "report_saved": "Report saved successfully",
-        "error_saving_report": "Error saving report"
+        "error_saving_report": "Error saving report",
+        "report_saving": "Your report is being saved to your report history",
+        # Rate limiting
+        "too_many_attempts": "Too many failed login attempts. Please try again in {minutes} minutes",
+        "too_many_analyses": "You have reached the analysis limit. Please try again in {minutes} minutes",
+        "queue_position": "Waiting for a free analysis slot (position {position} in queue)...",
+        # Near-duplicate ideas
+        "similar_idea_found": "This idea is {similarity}% similar to one you analyzed on {created_at}:",
+        "download_existing_report": "Download Existing Report",
+        "rerun_reusing_stages": "Re-run Reusing Earlier Analysis",
+        "run_full_analysis": "Run Full New Analysis",
+        "stage_reused": "Reused from your earlier analysis",
+        # Analytics
+        "analytics": "📊 Analytics",
+        "analytics_title": "Usage Analytics",
+        "refresh_analytics": "Refresh",
+        "analytics_refreshed_at": "Last refreshed",
+        "analytics_period": "Period (days)",
+        "total_reports": "Reports",
+        "active_users": "Active users",
+        "avg_report_seconds": "Avg. analysis time (s)",
+        "reports_per_day": "Reports per Day",
+        "credits_per_user": "Credits Used per User",
+        "reports_per_language": "Reports per Language",
+        "stage_latency": "Average Seconds per Agent Stage",
+        # User search
+        "search_users": "Search by username, name or email",
+        "sort_by": "Sort by",
+        "sort_order": "Order",
+        "last_login": "Last login",
+        "previous_page": "Previous",
+        "next_page": "Next",
+        "page_of": "Page {page} of {pages} ({total} users)",
+        # Bulk import and export
+        "bulk_import": "Bulk Import",
+        "bulk_import_file": "CSV or JSONL with username, password, email, name, credits, is_admin",
+        "bulk_import_button": "Import Users",
+        "bulk_importing": "Importing users...",
+        "bulk_import_result": "Imported {inserted} of {total} users",
+        "row_label": "Row",
+        "error_label": "Error",
+        "export_users": "Export Users",
+        "download_export": "Download Export",
+        "profile_runs": "Profile my analyses",
+        "profile_runs_help": "Store a cProfile and memory report with each analysis you run, downloadable from the report history",
+        "download_profile": "Download Profile",
+        "cache_hit_rate": "Prompt Tokens Served from Cache per Agent Stage",
+        "output_truncated": "This section was shortened to keep the report at a predictable length.",
+        "budget_hit_rate": "Runs Hitting the Output Budget per Agent Stage",
+        "generating_report": "Generating your report",
+        "new_analysis": "Start a New Analysis",
+        "translate_earlier_report": "Translate Earlier Report",
+        "translate_earlier_report_help": "Translates the earlier analysis into English instead of running all agents again",
+        "translating_report": "Translating the earlier analysis",
+        "plan_label": "Plan",
+        "llm_unavailable": "The AI service is not accepting requests right now, please try again in a few minutes"
     },
     "nl": {
         "title": "Business Builder",
@@ -135,6 +190,61 @@ UI_TRANSLATIONS = {
         "select_format": "Selecteer Formaat",
         "download_selected": "Download Geselecteerde Rapporten",
         "report_saved": "Rapport succesvol opgeslagen",
-        "error_saving_report": "Fout bij opslaan rapport"
+        "error_saving_report": "Fout bij opslaan rapport",
+        "report_saving": "Je rapport wordt opgeslagen in je rapportgeschiedenis",
+        # Rate limiting
+        "too_many_attempts": "Te veel mislukte inlogpogingen. Probeer het over {minutes} minuten opnieuw",
+        "too_many_analyses": "Je hebt de analyselimiet bereikt. Probeer het over {minutes} minuten opnieuw",
+        "queue_position": "Wachten op een vrije analyseplek (positie {position} in de wachtrij)...",
+        # Near-duplicate ideas
+        "similar_idea_found": "Dit idee lijkt voor {similarity}% op een idee dat je op {created_at} hebt geanalyseerd:",
+        "download_existing_report": "Bestaand Rapport Downloaden",
+        "rerun_reusing_stages": "Opnieuw Uitvoeren met Eerdere Analyse",
+        "run_full_analysis": "Volledige Nieuwe Analyse",
+        "stage_reused": "Hergebruikt uit je eerdere analyse",
+        # Analytics
+        "analytics": "📊 Statistieken",
+        "analytics_title": "Gebruiksstatistieken",
+        "refresh_analytics": "Vernieuwen",
+        "analytics_refreshed_at": "Laatst vernieuwd",
+        "analytics_period": "Periode (dagen)",
+        "total_reports": "Rapporten",
+        "active_users": "Actieve gebruikers",
+        "avg_report_seconds": "Gem. analysetijd (s)",
+        "reports_per_day": "Rapporten per Dag",
+        "credits_per_user": "Gebruikte Credits per Gebruiker",
+        "reports_per_language": "Rapporten per Taal",
+        "stage_latency": "Gemiddelde Seconden per Agentfase",
+        # User search
+        "search_users": "Zoek op gebruikersnaam, naam of e-mail",
+        "sort_by": "Sorteer op",
+        "sort_order": "Volgorde",
+        "last_login": "Laatste login",
+        "previous_page": "Vorige",
+        "next_page": "Volgende",
+        "page_of": "Pagina {page} van {pages} ({total} gebruikers)",
+        # Bulk import and export
+        "bulk_import": "Bulkimport",
+        "bulk_import_file": "CSV of JSONL met username, password, email, name, credits, is_admin",
+        "bulk_import_button": "Gebruikers Importeren",
+        "bulk_importing": "Gebruikers worden geïmporteerd...",
+        "bulk_import_result": "{inserted} van {total} gebruikers geïmporteerd",
+        "row_label": "Rij",
+        "error_label": "Fout",
+        "export_users": "Gebruikers Exporteren",
+        "download_export": "Export Downloaden",
+        "profile_runs": "Mijn analyses profileren",
+        "profile_runs_help": "Sla bij elke analyse die je uitvoert een cProfile- en geheugenrapport op, te downloaden via de rapportgeschiedenis",
+        "download_profile": "Profiel Downloaden",
+        "cache_hit_rate": "Prompttokens uit Cache per Agentfase",
+        "output_truncated": "Dit onderdeel is ingekort om het rapport een voorspelbare lengte te geven.",
+        "budget_hit_rate": "Runs die het Outputbudget Raken per Agentfase",
+        "generating_report": "Je rapport wordt gemaakt",
+        "new_analysis": "Nieuwe Analyse Starten",
+        "translate_earlier_report": "Eerder Rapport Vertalen",
+        "translate_earlier_report_help": "Vertaalt de eerdere analyse naar het Nederlands in plaats van alle agents opnieuw uit te voeren",
+        "translating_report": "De eerdere analyse wordt vertaald",
+        "plan_label": "Abonnement",
+        "llm_unavailable": "De AI-dienst neemt op dit moment geen verzoeken aan, probeer het over een paar minuten opnieuw"
     }
 } 
\ No newline at end of file
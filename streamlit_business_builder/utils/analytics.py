@@ -0,0 +1,186 @@
+import logging
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("clarity", "niche", "action", "strategy")
+
+# Ideas newer than this are left for the next refresh, so reports that are
+# still being written don't slip behind the watermark
+REFRESH_LAG = timedelta(seconds=5)
+# A refresh that hasn't finished its window within this long is taken to have failed
+REFRESH_LEASE = timedelta(minutes=5)
+
+
+def _summary_pipeline(since, until):
+    """Aggregate ideas into one row per day, user and language"""
+    group = {
+        "_id": {
+            "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+            "username": "$username",
+            "language": "$language"
+        },
+        "reports": {"$sum": 1}
+    }
+    for stage in STAGES:
+        group[f"{stage}_seconds"] = {"$sum": {"$ifNull": [f"$stage_timings.{stage}", 0]}}
+        group[f"{stage}_runs"] = {"$sum": {"$cond": [{"$ifNull": [f"$stage_timings.{stage}", False]}, 1, 0]}}
+        group[f"{stage}_prompt_tokens"] = {"$sum": {"$ifNull": [f"$stage_usage.{stage}.prompt_tokens", 0]}}
+        group[f"{stage}_cache_hit_tokens"] = {"$sum": {"$ifNull": [f"$stage_usage.{stage}.cache_hit_tokens", 0]}}
+        group[f"{stage}_budget_hits"] = {"$sum": {"$cond": [{"$ifNull": [f"$stage_usage.{stage}.budget_hit", False]}, 1, 0]}}
+
+    match = {"created_at": {"$lte": until}}
+    if since:
+        match["created_at"]["$gt"] = since
+    return [{"$match": match}, {"$group": group}]
+
+
+def _claim_window(db, state, owner):
+    """
+    Record the window to aggregate as pending under `owner`, returns (since, until) or None.
+    A new window (watermark, now - REFRESH_LAG] is only claimed while nothing is pending; a pending
+    window whose lease expired, because its refresh failed or died, is taken over and retried.
+    """
+    now = datetime.utcnow()
+    lease = {"owner": owner, "expires_at": now + REFRESH_LEASE}
+    pending = state.get("pending")
+    try:
+        if pending:
+            if pending["expires_at"] > now:
+                return None
+            result = db.analytics_state.update_one(
+                {"_id": "daily", "pending.owner": pending["owner"]},
+                {"$set": {"pending.owner": owner, "pending.expires_at": lease["expires_at"]}}
+            )
+            return (pending["since"], pending["until"]) if result.modified_count == 1 else None
+
+        since = state.get("watermark")
+        until = now - REFRESH_LAG
+        if since and since >= until:
+            return None
+        db.analytics_state.update_one(
+            {"_id": "daily", "watermark": since, "pending": None},
+            {"$set": {"pending": {"since": since, "until": until, **lease}}},
+            upsert=True
+        )
+        return since, until
+    except DuplicateKeyError:
+        # The state moved on, the upsert collided with the existing state document
+        return None
+
+
+def _fold_window(db, since, until):
+    """Add the ideas of one window to analytics_daily, returns the number of rows written"""
+    updates = []
+    for row in db.business_ideas.aggregate(_summary_pipeline(since, until), allowDiskUse=True):
+        increments = {key: value for key, value in row.items() if key != "_id"}
+        # Rows remember the last window added to them, so a retried window skips the rows
+        # its failed attempt already counted; windows are folded one at a time, in order
+        updates.append(UpdateOne(
+            {"_id": row["_id"], "window": {"$ne": until}},
+            {"$inc": increments, "$set": {"day": row["_id"]["day"], "window": until}},
+            upsert=True
+        ))
+    if not updates:
+        return 0
+    try:
+        db.analytics_daily.bulk_write(updates, ordered=False)
+    except BulkWriteError as e:
+        # A row that already has this window doesn't match, so its upsert collides with it
+        if any(error["code"] != 11000 for error in e.details["writeErrors"]) or e.details.get("writeConcernErrors"):
+            raise
+    return len(updates)
+
+
+def refresh_summary(db):
+    """
+    Fold ideas created since the last refresh into the analytics_daily collection.
+    Only new ideas are aggregated, so the cost depends on the number of new reports.
+    """
+    state = db.analytics_state.find_one({"_id": "daily"}) or {}
+    owner = str(ObjectId())
+    window = _claim_window(db, state, owner)
+    if not window:
+        logger.info("Analytics summary is up to date or being refreshed by another session")
+        return state.get("refreshed_at")
+
+    since, until = window
+    # On failure the window stays pending, a refresh after its lease expired retries it
+    rows = _fold_window(db, since, until)
+    db.analytics_state.update_one(
+        {"_id": "daily", "pending.owner": owner},
+        {"$set": {"watermark": until, "refreshed_at": datetime.utcnow()}, "$unset": {"pending": ""}}
+    )
+    logger.info(f"Analytics summary refreshed with {rows} rows")
+    return state.get("refreshed_at")
+
+
+def last_refreshed(db):
+    state = db.analytics_state.find_one({"_id": "daily"})
+    return state.get("refreshed_at") if state else None
+
+
+def load_summary(db, days=90):
+    """Load the materialized summary for the last days as a DataFrame"""
+    start = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
+    rows = list(db.analytics_daily.find({"day": {"$gte": start}}))
+    if not rows:
+        return pd.DataFrame()
+
+    df = pd.json_normalize(rows)
+    df = df.rename(columns={"_id.username": "username", "_id.language": "language"})
+    df["day"] = pd.to_datetime(df["day"])
+    return df.drop(columns=["_id.day", "window"], errors="ignore")
+
+
+def reports_per_day(df):
+    return df.groupby("day")["reports"].sum().sort_index()
+
+
+def reports_per_user(df, top=20):
+    """Reports per user, which is also the number of credits each user spent"""
+    return df.groupby("username")["reports"].sum().nlargest(top)
+
+
+def reports_per_language(df):
+    return df.groupby("language")["reports"].sum()
+
+
+def stage_latency(df):
+    """Average seconds per agent stage"""
+    seconds = df[[f"{stage}_seconds" for stage in STAGES]].sum().to_numpy()
+    runs = df[[f"{stage}_runs" for stage in STAGES]].sum().to_numpy()
+    averages = np.divide(seconds, runs, out=np.zeros_like(seconds, dtype=float), where=runs > 0)
+    return pd.Series(averages, index=list(STAGES))
+
+
+def stage_latency_per_day(df):
+    """Average seconds per agent stage and day"""
+    daily = df.groupby("day").sum(numeric_only=True)
+    seconds = daily[[f"{stage}_seconds" for stage in STAGES]].to_numpy()
+    runs = daily[[f"{stage}_runs" for stage in STAGES]].to_numpy()
+    averages = np.divide(seconds, runs, out=np.full_like(seconds, np.nan, dtype=float), where=runs > 0)
+    return pd.DataFrame(averages, index=daily.index, columns=list(STAGES))
+
+
+def cache_hit_rate(df):
+    """Share of prompt tokens per agent stage that the provider served from its context cache"""
+    # Rows summarized before token usage was recorded have no token columns
+    prompt = df.reindex(columns=[f"{stage}_prompt_tokens" for stage in STAGES], fill_value=0).sum().to_numpy()
+    hits = df.reindex(columns=[f"{stage}_cache_hit_tokens" for stage in STAGES], fill_value=0).sum().to_numpy()
+    rates = np.divide(hits, prompt, out=np.zeros_like(hits, dtype=float), where=prompt > 0)
+    return pd.Series(rates, index=list(STAGES))
+
+
+def budget_hit_rate(df):
+    """Share of runs per agent stage whose output hit the token budget"""
+    hits = df.reindex(columns=[f"{stage}_budget_hits" for stage in STAGES], fill_value=0).sum().to_numpy()
+    runs = df[[f"{stage}_runs" for stage in STAGES]].sum().to_numpy()
+    rates = np.divide(hits, runs, out=np.zeros_like(hits, dtype=float), where=runs > 0)
+    return pd.Series(rates, index=list(STAGES))
@@ -0,0 +1,100 @@
+"""
+Move the reports of old ideas out of business_ideas into the compressed report_archive collection.
+
+    python -m utils.archive --older-than-days 180
+
+The idea stays in business_ideas as a stub without its reports and stage outputs, so listings,
+similarity search and analytics keep working; get_idea_reports reads archived reports back
+from report_archive. Safe to interrupt and run again, e.g. nightly from cron.
+"""
+import argparse
+import logging
+import os
+import zlib
+from datetime import datetime, timedelta
+
+import bson
+from bson.binary import Binary
+
+logger = logging.getLogger(__name__)
+
+# Heavy fields moved to the archive, everything else stays in the stub
+ARCHIVED_FIELDS = ("pdf_report", "txt_report", "stage_outputs", "profile")
+ARCHIVE_AFTER_DAYS = int(os.getenv("REPORT_ARCHIVE_AFTER_DAYS", "180"))
+
+
+def archived_fields(idea: dict) -> dict:
+    return {field: idea[field] for field in ARCHIVED_FIELDS if idea.get(field) is not None}
+
+
+def unpack_reports(archive: dict) -> dict:
+    """Archived fields of an idea, empty when the archive document is missing"""
+    if not archive:
+        return {}
+    return bson.decode(zlib.decompress(archive["data"]))
+
+
+def archive_old_reports(db, older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = 100) -> dict:
+    """
+    Archive the reports of ideas created more than `older_than_days` ago
+    Returns: {"ideas": archived count, "bytes": size before compression, "compressed_bytes": size after}
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    stats = {"ideas": 0, "bytes": 0, "compressed_bytes": 0}
+    try:
+        cursor = db.business_ideas.find(
+            {"created_at": {"$lt": cutoff}, "archived": False},
+            {"idea_id": 1, **{field: 1 for field in ARCHIVED_FIELDS}},
+            batch_size=batch_size
+        ).sort("created_at", 1)
+
+        batch = []
+        for idea in cursor:
+            batch.append(idea)
+            if len(batch) >= batch_size:
+                _archive_batch(db, batch, stats)
+                batch = []
+        if batch:
+            _archive_batch(db, batch, stats)
+    except Exception as e:
+        logger.error(f"Error archiving reports: {e}")
+    logger.info(f"Archived reports of {stats['ideas']} ideas")
+    return stats
+
+
+def _archive_batch(db, ideas, stats):
+    now = datetime.utcnow()
+    for idea in ideas:
+        raw = bson.encode(archived_fields(idea))
+        data = zlib.compress(raw, 6)
+        # The archive is written first, a run interrupted before the stubs are updated just archives again
+        db.report_archive.replace_one(
+            {"idea_id": idea["idea_id"]},
+            {"idea_id": idea["idea_id"], "archived_at": now, "data": Binary(data)},
+            upsert=True
+        )
+        stats["bytes"] += len(raw)
+        stats["compressed_bytes"] += len(data)
+    db.business_ideas.update_many(
+        {"_id": {"$in": [idea["_id"] for idea in ideas]}},
+        {"$set": {"archived": True, "archived_at": now}, "$unset": {field: "" for field in ARCHIVED_FIELDS}}
+    )
+    stats["ideas"] += len(ideas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive the reports of old business ideas")
+    parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    from utils.database import Database
+
+    stats = archive_old_reports(Database(), args.older_than_days, args.batch_size)
+    saved = stats["bytes"] - stats["compressed_bytes"]
+    print(f"Archived {stats['ideas']} ideas, {stats['bytes'] / 1024 / 1024:.1f} MiB compressed to "
+          f"{stats['compressed_bytes'] / 1024 / 1024:.1f} MiB ({saved / 1024 / 1024:.1f} MiB saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+
+import bcrypt
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient
+from pymongo.errors import BulkWriteError
+
+from utils.database import (Database, CASE_INSENSITIVE, IDEA_LIST_PROJECTION, IDEA_REPORTS_PROJECTION,
+                            MONGO_MIN_POOL_SIZE, bulk_insert_errors, idea_reports, most_similar,
+                            similar_ideas_query, user_search_filter, user_sort, user_updates)
+from utils.archive import unpack_reports
+from utils.scheduler import DEFAULT_PLAN
+from utils.similarity import minhash
+from utils.tracing import mongo_event_listeners
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncDatabase:
+    """
+    asyncio counterpart of Database with the same methods as coroutines,
+    so independent queries can run concurrently. Documents, filters and result
+    shapes come from utils.database, so the two can't drift apart.
+    Index setup and backfills stay with the synchronous Database.
+    """
+
+    def __init__(self, client=None):
+        load_dotenv()  # Load environment variables
+        self.client = client or AsyncMongoClient(os.getenv("MONGODB_URI"), minPoolSize=MONGO_MIN_POOL_SIZE,
+                                                 event_listeners=mongo_event_listeners())
+        self.db = self.client[os.getenv("MONGODB_DB", "business_builder")]
+        self.users = self.db.users
+        self.business_ideas = self.db.business_ideas
+        self.report_archive = self.db.report_archive
+        self.translation_cache = self.db.translation_cache
+
+    # Documents are built by Database, so both write the same shape
+    idea_document = staticmethod(Database.idea_document)
+    translation_document = staticmethod(Database.translation_document)
+    user_document = staticmethod(Database.user_document)
+
+    async def save_business_idea(self, username, idea_text, pdf_data, txt_data, language, stage_outputs=None, stage_timings=None, idea_id=None, profile=None, stage_usage=None, prompt_version=None):
+        """Save a business idea and its generated reports"""
+        try:
+            idea_doc = self.idea_document(username, idea_text, pdf_data, txt_data, language, stage_outputs,
+                                          stage_timings, idea_id, profile, stage_usage, prompt_version)
+            await self.business_ideas.insert_one(idea_doc)
+            logger.info(f"Business idea saved for user {username}")
+            return idea_doc["idea_id"]
+        except Exception as e:
+            logger.error(f"Error saving business idea for user {username}: {e}")
+            raise
+
+    async def find_similar_idea(self, username, idea_text, threshold=0.7):
+        """Find the most similar earlier idea of a user, using the LSH band index"""
+        try:
+            signature = minhash(idea_text)
+            # Candidates share an LSH band with the idea, few enough to read at once
+            candidates = await self.business_ideas.find(*similar_ideas_query(username, signature)).to_list()
+            return most_similar(signature, candidates, threshold)
+        except Exception as e:
+            logger.error(f"Error finding similar ideas for user {username}: {e}")
+            return None
+
+    async def get_user_ideas(self, username):
+        """Get all business ideas for a specific user"""
+        try:
+            return await self.business_ideas.find(
+                {"username": username}, IDEA_LIST_PROJECTION
+            ).sort("created_at", -1).to_list()
+        except Exception as e:
+            logger.error(f"Error getting ideas for user {username}: {e}")
+            return []
+
+    async def get_all_ideas(self):
+        """Get all business ideas (admin only)"""
+        try:
+            return await self.business_ideas.find({}, IDEA_LIST_PROJECTION).sort("created_at", -1).to_list()
+        except Exception as e:
+            logger.error(f"Error getting all ideas: {e}")
+            return []
+
+    async def get_idea_reports(self, idea_id):
+        """Get reports for a specific business idea"""
+        try:
+            idea = await self.business_ideas.find_one({"idea_id": idea_id}, IDEA_REPORTS_PROJECTION)
+            if idea and idea.get("archived"):
+                idea = unpack_reports(await self.report_archive.find_one({"idea_id": idea_id}))
+            return idea_reports(idea)
+        except Exception as e:
+            logger.error(f"Error getting reports for idea {idea_id}: {e}")
+            return None
+
+    async def has_idea(self, idea_id):
+        """Whether an idea has been saved, without reading its reports"""
+        try:
+            return await self.business_ideas.count_documents({"idea_id": idea_id}, limit=1) > 0
+        except Exception as e:
+            logger.error(f"Error checking idea {idea_id}: {e}")
+            return False
+
+    async def get_multiple_reports(self, idea_ids):
+        """Get reports for multiple business ideas"""
+        try:
+            reports = await self.business_ideas.find(
+                {"idea_id": {"$in": idea_ids}},
+                {"idea_id": 1, "pdf_report": 1, "txt_report": 1, "archived": 1}
+            ).to_list()
+            archived = [report["idea_id"] for report in reports if report.get("archived")]
+            if archived:
+                archives = {archive["idea_id"]: archive async for archive in self.report_archive.find({"idea_id": {"$in": archived}})}
+                for report in reports:
+                    if report.get("archived"):
+                        report.update(unpack_reports(archives.get(report["idea_id"])))
+            return reports
+        except Exception as e:
+            logger.error(f"Error getting multiple reports: {e}")
+            return []
+
+    async def get_cached_translation(self, key):
+        """Cached translation of an agent output, None when it has not been translated before"""
+        try:
+            cached = await self.translation_cache.find_one({"_id": key}, {"text": 1})
+            return cached["text"] if cached else None
+        except Exception as e:
+            logger.error(f"Error reading cached translation {key}: {e}")
+            return None
+
+    async def cache_translation(self, key, language, text):
+        try:
+            await self.translation_cache.replace_one({"_id": key}, self.translation_document(key, language, text),
+                                                     upsert=True)
+        except Exception as e:
+            # The translation is still used, only the next run pays for it again
+            logger.warning(f"Error caching translation {key}: {e}")
+
+    async def iter_reports(self, idea_ids, concurrency=8):
+        """Yield reports in order while up to `concurrency` blob reads are in flight"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(idea_id):
+            async with semaphore:
+                reports = await self.get_idea_reports(idea_id)
+                return {"idea_id": idea_id, **reports} if reports else None
+
+        tasks = [asyncio.ensure_future(fetch(idea_id)) for idea_id in idea_ids]
+        try:
+            for task in tasks:
+                report = await task
+                if report:
+                    yield report
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def create_users_bulk(self, user_documents, batch_size=1000):
+        """
+        Insert many users, continuing past duplicates
+        Returns: (number inserted, [(document index, error message)])
+        """
+        inserted = 0
+        errors = []
+        for start in range(0, len(user_documents), batch_size):
+            batch = user_documents[start:start + batch_size]
+            try:
+                result = await self.users.insert_many(batch, ordered=False)
+                inserted += len(result.inserted_ids)
+            except BulkWriteError as e:
+                inserted += e.details.get("nInserted", 0)
+                errors.extend(bulk_insert_errors(e, start))
+            except Exception as e:
+                logger.error(f"Error inserting users in bulk: {e}")
+                errors.extend((start + i, str(e)) for i in range(len(batch)))
+        return inserted, errors
+
+    async def create_user(self, username, password, email, name, credits=5, is_admin=False, plan=DEFAULT_PLAN):
+        """Create a new user"""
+        try:
+            # bcrypt is CPU bound, keep it off the event loop
+            hashed = await asyncio.to_thread(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt())
+            await self.users.insert_one(self.user_document(username, hashed, email, name, credits, is_admin, plan))
+            logger.info(f"User created successfully: {username}")
+            return True
+        except Exception as e:
+            logger.error(f"Error creating user {username}: {e}")
+            return False
+
+    async def verify_user(self, username, password):
+        """Verify user credentials"""
+        try:
+            user = await self.get_user(username)
+            if not user:
+                logger.warning(f"User not found: {username}")
+                return None
+
+            hashed = user['password'] if isinstance(user['password'], bytes) else user['password'].encode('utf-8')
+            if await asyncio.to_thread(bcrypt.checkpw, password.encode('utf-8'), hashed):
+                await self.users.update_one(
+                    {"_id": user["_id"]},
+                    {"$set": {"last_login": datetime.utcnow()}}
+                )
+                return user
+            logger.warning(f"Invalid password for user: {username}")
+            return None
+        except Exception as e:
+            logger.error(f"Error verifying user {username}: {e}")
+            return None
+
+    async def get_user(self, username):
+        """Get user by username"""
+        try:
+            return await self.users.find_one(
+                {"username": username},
+                collation=CASE_INSENSITIVE
+            )
+        except Exception as e:
+            logger.error(f"Error getting user {username}: {e}")
+            return None
+
+    async def update_credits(self, username, credits):
+        """Update user credits"""
+        try:
+            await self.users.update_one(
+                {"username": username},
+                {"$set": {"credits": credits}},
+                collation=CASE_INSENSITIVE
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error updating credits for user {username}: {e}")
+            return False
+
+    async def search_users(self, query="", sort_by="created_at", descending=True, page=0, page_size=25):
+        """
+        Search users by username, name or email prefix, one page at a time
+        Returns: (users, total)
+        """
+        try:
+            filter_ = user_search_filter(query)
+            total, users = await asyncio.gather(
+                self.users.count_documents(filter_),
+                self.users.find(filter_, {"password": 0})
+                    .sort(user_sort(sort_by, descending))
+                    .skip(page * page_size)
+                    .limit(page_size)
+                    .to_list()
+            )
+            return users, total
+        except Exception as e:
+            logger.error(f"Error searching users: {e}")
+            return [], 0
+
+    async def list_users(self):
+        """List all users"""
+        try:
+            return await self.users.find({}, {"password": 0}).to_list()
+        except Exception as e:
+            logger.error(f"Error listing users: {e}")
+            return []
+
+    async def delete_user(self, username):
+        """Delete a user"""
+        try:
+            await self.users.delete_one(
+                {"username": username},
+                collation=CASE_INSENSITIVE
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting user {username}: {e}")
+            return False
+
+    async def update_user(self, username, updates):
+        """Update user details"""
+        try:
+            if "password" in updates:
+                updates["password"] = await asyncio.to_thread(
+                    bcrypt.hashpw, updates["password"].encode('utf-8'), bcrypt.gensalt()
+                )
+            await self.users.update_one(
+                {"username": username},
+                {"$set": user_updates(updates)},
+                collation=CASE_INSENSITIVE
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error updating user {username}: {e}")
+            return False
+
+
+class _EventLoopThread:
+    """Event loop in a daemon thread, so synchronous Streamlit code can run coroutines on a long-lived client"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="async-database", daemon=True)
+        self.thread.start()
+        self.database = None
+
+    def run(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+_loop_thread = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop_thread():
+    global _loop_thread
+    with _loop_lock:
+        if _loop_thread is None:
+            _loop_thread = _EventLoopThread()
+        return _loop_thread
+
+
+def run_async(func, timeout=None):
+    """
+    Run `func(db)` on the shared AsyncDatabase from synchronous code and return its result.
+    Example: ideas, reports = run_async(lambda db: asyncio.gather(db.get_user(u), db.get_user_ideas(u)))
+    """
+    loop_thread = _get_loop_thread()
+
+    async def call():
+        # The client belongs to the loop it was created on
+        if loop_thread.database is None:
+            loop_thread.database = AsyncDatabase()
+        return await func(loop_thread.database)
+
+    return loop_thread.run(call(), timeout)
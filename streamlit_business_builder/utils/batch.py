@@ -0,0 +1,167 @@
+"""
+Generate reports for a list of business ideas from the command line.
+
+    python -m utils.batch ideas.jsonl --output-dir batch_reports --concurrency 8
+
+Each CSV or JSONL row needs an `idea` and may set `language` (en/nl), `username`
+and `id`. Finished rows are appended to results.jsonl in the output directory;
+running the same command again skips them, so an interrupted batch resumes.
+No credits are charged.
+"""
+import argparse
+import asyncio
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import median
+from typing import List, Optional
+
+from utils.bulk_users import parse_rows
+
+RESULTS_FILE = "results.jsonl"
+
+
+def row_key(row: dict) -> str:
+    """Stable key of a row, so a resumed batch recognises rows it already did"""
+    if row.get("id"):
+        return str(row["id"])
+    text = f"{row.get('username', '')}\n{row.get('language', '')}\n{row.get('idea', '')}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+
+def load_done(results_path: str) -> set:
+    """Keys of the rows that finished in an earlier run"""
+    done = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # Last line of an interrupted run
+                continue
+            if result.get("status") == "ok":
+                done.add(result["key"])
+    return done
+
+
+def _run_row(row: dict, output_dir: str, persist: bool):
+    from main import run_business_builder
+
+    # Wait for the save, a row recorded as ok must not be lost to an interrupted batch
+    return run_business_builder(
+        row["idea"],
+        row.get("language") or "en",
+        row.get("username") or "batch",
+        persist=persist,
+        output_dir=output_dir,
+        wait_saved=True
+    )
+
+
+async def run_batch(rows: List[dict], output_dir: str, concurrency: int = 4, persist: bool = True) -> List[dict]:
+    """Run the analysis for every row not done yet, at most `concurrency` at a time"""
+    os.makedirs(output_dir, exist_ok=True)
+    results_path = os.path.join(output_dir, RESULTS_FILE)
+    done = load_done(results_path)
+    pending = [row for row in rows if row_key(row) not in done]
+    print(f"{len(rows)} ideas, {len(rows) - len(pending)} already done, {len(pending)} to run")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    # asyncio.to_thread's default executor has at most min(32, cpu count + 4) threads
+    executor = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch")
+    loop = asyncio.get_running_loop()
+    results = []
+
+    async def process(row):
+        key = row_key(row)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                # The pipeline is synchronous, each row gets a worker thread with the caller's context
+                txt_file, pdf_file = await loop.run_in_executor(
+                    executor, contextvars.copy_context().run, _run_row, row, output_dir, persist
+                )
+                result = {"key": key, "status": "ok", "txt_file": txt_file, "pdf_file": pdf_file}
+            except Exception as e:
+                result = {"key": key, "status": "failed", "error": str(e)}
+            result["seconds"] = round(time.perf_counter() - started, 2)
+
+        # Results are appended from the event loop thread only
+        with open(results_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+        results.append(result)
+        print(f"[{len(results)}/{len(pending)}] {result['status']:<6} {key} {result['seconds']:.1f}s")
+
+    batch_started = time.perf_counter()
+    try:
+        await asyncio.gather(*(process(row) for row in pending))
+    finally:
+        executor.shutdown(wait=False)
+    print_stats(results, time.perf_counter() - batch_started)
+    return results
+
+
+def print_stats(results: List[dict], elapsed: float):
+    ok = [r["seconds"] for r in results if r["status"] == "ok"]
+    failed = len(results) - len(ok)
+    print(f"\nFinished {len(ok)} reports, {failed} failed, in {elapsed:.1f}s")
+    if ok and elapsed > 0:
+        ok.sort()
+        p95 = ok[min(len(ok) - 1, int(len(ok) * 0.95))]
+        print(f"Throughput: {len(ok) / elapsed * 60:.1f} reports/min")
+        print(f"Per report: median {median(ok):.1f}s, p95 {p95:.1f}s, max {ok[-1]:.1f}s")
+
+
+def validate_rows(rows: List[dict]) -> Optional[str]:
+    from translations import UI_TRANSLATIONS
+
+    for number, row in enumerate(rows, start=1):
+        if not str(row.get("idea") or "").strip():
+            return f"Row {number}: idea is required"
+        if (row.get("language") or "en") not in UI_TRANSLATIONS:
+            return f"Row {number}: unknown language {row['language']}"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate Business Builder reports for a file of ideas")
+    parser.add_argument("file", help="CSV or JSONL with idea, language, username and optional id columns")
+    parser.add_argument("--output-dir", default=os.path.join("generated_files", "batch"))
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--no-mongo", action="store_true", help="Only write report files, don't save them to MongoDB")
+    args = parser.parse_args()
+
+    # st.* calls in the pipeline are no-ops outside a Streamlit session
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda record: record.levelno >= logging.ERROR
+    )
+
+    with open(args.file, "rb") as f:
+        rows = parse_rows(f.read(), args.file)
+    error = validate_rows(rows)
+    if error:
+        print(error, file=sys.stderr)
+        sys.exit(2)
+
+    results = asyncio.run(run_batch(rows, args.output_dir, args.concurrency, persist=not args.no_mongo))
+
+    if not args.no_mongo:
+        from main import Database, get_report_writer
+
+        spooled = get_report_writer(Database).pending_spooled()
+        if spooled:
+            print(f"{spooled} reports could not reach MongoDB and are spooled, they are saved once it is reachable")
+    sys.exit(1 if any(r["status"] != "ok" for r in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
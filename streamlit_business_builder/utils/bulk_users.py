@@ -0,0 +1,185 @@
+import argparse
+import csv
+import io
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import bcrypt
+
+from utils.scheduler import DEFAULT_PLAN, PLANS
+from utils.security import SecurityUtils
+
+EXPORT_FIELDS = ["username", "name", "email", "credits", "is_admin", "plan", "created_at", "last_login"]
+
+
+def parse_rows(data: bytes, filename: str) -> List[dict]:
+    """
+    Parse an uploaded CSV or JSONL file into row dicts
+    JSONL lines that don't parse become a ValueError in their place, reported by validate_row
+    """
+    text = data.decode("utf-8-sig")
+    if not filename.lower().endswith((".jsonl", ".json")):
+        return list(csv.DictReader(io.StringIO(text)))
+    rows = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            rows.append(ValueError(f"Invalid JSON: {e.msg}"))
+    return rows
+
+
+def _parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def validate_row(row: dict) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Validate an import row
+    Returns: (user fields, error_message)
+    """
+    if isinstance(row, ValueError):
+        return None, str(row)
+    if not isinstance(row, dict):
+        return None, "Row must be an object"
+    username = str(row.get("username") or "").strip().lower()
+    password = str(row.get("password") or "")
+    email = str(row.get("email") or "").strip()
+    name = SecurityUtils.sanitize_input(str(row.get("name") or "").strip())
+
+    valid, error = SecurityUtils.validate_username(username)
+    if not valid:
+        return None, error
+    valid, error = SecurityUtils.validate_password_strength(password)
+    if not valid:
+        return None, error
+    # bcrypt only hashes the first 72 bytes, and newer versions refuse longer passwords
+    if len(password.encode("utf-8")) > 72:
+        return None, "Password can't be longer than 72 bytes"
+    if not SecurityUtils.validate_email(email):
+        return None, "Invalid email address"
+    if not name:
+        return None, "Name is required"
+    credits = row.get("credits")
+    if credits is None or str(credits).strip() == "":
+        credits = 5
+    try:
+        credits = int(credits)
+    except (TypeError, ValueError):
+        return None, "Credits must be a number"
+    if credits < 0:
+        return None, "Credits can't be negative"
+    plan = str(row.get("plan") or DEFAULT_PLAN).strip().lower()
+    if plan not in PLANS:
+        return None, f"Plan must be one of {', '.join(PLANS)}"
+
+    return {
+        "username": username,
+        "password": password,
+        "email": email,
+        "name": name,
+        "credits": credits,
+        "is_admin": _parse_bool(row.get("is_admin", False)),
+        "plan": plan
+    }, None
+
+
+def _hash_password(password: str) -> bytes:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+
+
+def hash_passwords(passwords: List[str], workers: Optional[int] = None) -> List[bytes]:
+    """Hash passwords across a process pool, bcrypt is deliberately slow"""
+    if len(passwords) < 2:
+        return [_hash_password(p) for p in passwords]
+    workers = workers or os.cpu_count() or 1
+    # spawn, because forking a multi-threaded Streamlit server is unsafe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        return list(pool.map(_hash_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+def import_users(db, rows: List[dict], workers: Optional[int] = None) -> Tuple[int, List[Tuple[int, str]]]:
+    """
+    Validate, hash and insert users in bulk
+    Returns: (number of users created, [(row number, error message)])
+    """
+    errors = []
+    valid_rows = []
+    for number, row in enumerate(rows, start=1):
+        user, error = validate_row(row)
+        if error:
+            errors.append((number, error))
+        else:
+            valid_rows.append((number, user))
+
+    hashes = hash_passwords([user["password"] for _, user in valid_rows], workers)
+    documents = [
+        db.user_document(user["username"], hashed, user["email"], user["name"], user["credits"], user["is_admin"],
+                         user["plan"])
+        for (_, user), hashed in zip(valid_rows, hashes)
+    ]
+    inserted, write_errors = db.create_users_bulk(documents)
+    errors.extend((valid_rows[index][0], message) for index, message in write_errors)
+    return inserted, sorted(errors)
+
+
+def iter_user_export(db, fmt: str = "csv") -> Iterator[str]:
+    """Stream users and credit balances as CSV or JSONL lines"""
+    cursor = db.users.find({}, {field: 1 for field in EXPORT_FIELDS} | {"_id": 0}).batch_size(500)
+    if fmt == "jsonl":
+        for user in cursor:
+            yield json.dumps(user, default=str) + "\n"
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for user in cursor:
+        writer.writerow(user)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _write_lines(lines: Iterable[str], out):
+    for line in lines:
+        out.write(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import and export of Business Builder users")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    import_parser = subparsers.add_parser("import", help="Import users from a CSV or JSONL file")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--workers", type=int, default=None)
+    export_parser = subparsers.add_parser("export", help="Export users to stdout")
+    export_parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    args = parser.parse_args()
+
+    from utils.database import Database
+    db = Database()
+
+    if args.command == "import":
+        with open(args.file, "rb") as f:
+            rows = parse_rows(f.read(), args.file)
+        inserted, errors = import_users(db, rows, args.workers)
+        for number, message in errors:
+            print(f"Row {number}: {message}", file=sys.stderr)
+        print(f"Imported {inserted} of {len(rows)} users")
+        sys.exit(1 if errors else 0)
+    else:
+        _write_lines(iter_user_export(db, args.format), sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
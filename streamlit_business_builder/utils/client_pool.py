@@ -0,0 +1,148 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# How long a key sits out after the provider rejects it
+RATE_LIMIT_COOLDOWN = 30.0
+AUTH_COOLDOWN = 600.0
+ROTATE_STATUSES = (401, 403, 429)
+
+# HTTP connections per LLM client, and how long an idle one stays open for the next call.
+# httpx closes idle connections after 5 seconds by default, so calls minutes apart each paid a TLS handshake
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "300"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+
+
+class PoolExhausted(Exception):
+    """Every key of the pool is cooling down, or the pool has no keys"""
+
+
+class _Member:
+    def __init__(self, name, key_id, client):
+        self.name = name
+        self.key_id = key_id
+        self.client = client
+        self.in_flight = 0
+        self.uses = 0
+
+
+def _status_code(error) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status
+
+
+def _retry_after(error) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ClientPool:
+    """
+    Spreads LLM calls over several API keys and base URLs.
+    Each call goes to the member with the fewest calls in flight; a key answering
+    429 or an authentication error is taken out of rotation for a while.
+    """
+
+    def __init__(self, members: List[Tuple[str, str, object]]):
+        """members: (name, key id, client) per API key and base URL combination"""
+        self._members = [_Member(name, key_id, client) for name, key_id, client in members]
+        self._cooldowns = {}  # key id -> monotonic time the key may be used again
+        self._lock = threading.Lock()
+
+    @property
+    def key_count(self) -> int:
+        return len({member.key_id for member in self._members})
+
+    def _acquire(self) -> _Member:
+        now = time.monotonic()
+        with self._lock:
+            if not self._members:
+                raise PoolExhausted("No API keys configured")
+            available = [m for m in self._members if self._cooldowns.get(m.key_id, 0) <= now]
+            if not available:
+                wait = min(self._cooldowns.values()) - now
+                raise PoolExhausted(f"All API keys are cooling down, retry in {wait:.0f} seconds")
+            member = min(available, key=lambda m: (m.in_flight, m.uses))
+            member.in_flight += 1
+            member.uses += 1
+            return member
+
+    def _release(self, member, error=None):
+        with self._lock:
+            member.in_flight -= 1
+            if error is None:
+                return
+            status = _status_code(error)
+            if status == 429:
+                cooldown = _retry_after(error) or RATE_LIMIT_COOLDOWN
+            elif status in ROTATE_STATUSES:
+                cooldown = AUTH_COOLDOWN
+            else:
+                return
+            self._cooldowns[member.key_id] = time.monotonic() + cooldown
+        logger.warning(f"LLM client {member.name} out of rotation for {cooldown:.0f} seconds after HTTP {status}")
+
+    def clients(self) -> List[Tuple[str, object]]:
+        """(name, client) of every member, for probes that bypass the rotation"""
+        return [(member.name, member.client) for member in self._members]
+
+    @contextmanager
+    def client(self):
+        """Lease the least busy client for the duration of a call"""
+        member = self._acquire()
+        try:
+            yield member.client
+        except Exception as e:
+            self._release(member, e)
+            raise
+        self._release(member)
+
+    def call(self, func):
+        """Run `func(client)`, moving on to another key or base URL when one is rate limited or rejected"""
+        if not self._members:
+            raise PoolExhausted("No API keys configured")
+        # Every member may be tried once, keys are tried at each of their base URLs
+        for attempt in range(len(self._members)):
+            try:
+                with self.client() as client:
+                    return func(client)
+            except Exception as e:
+                if _status_code(e) not in ROTATE_STATUSES or attempt == len(self._members) - 1:
+                    raise
+
+
+def http_client():
+    """
+    httpx client for an OpenAI client: idle connections are kept open for reuse,
+    and a failed connect is retried once before the SDK's own retries
+    """
+    import httpx
+    from openai import DefaultHttpxClient
+
+    limits = httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+    )
+    return DefaultHttpxClient(
+        transport=httpx.HTTPTransport(limits=limits, retries=1),
+        timeout=httpx.Timeout(600.0, connect=LLM_CONNECT_TIMEOUT)
+    )
+
+
+def parse_list(value) -> List[str]:
+    """Secrets may hold a list or a comma separated string"""
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return [str(item) for item in value]
@@ -1,26 +1,143 @@
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
 import bcrypt
 from datetime import datetime
 import logging
 import os
+import re
+import threading
+import time
 from dotenv import load_dotenv
 from bson import ObjectId
+from utils.archive import unpack_reports
+from utils.migrations import migrate_in_background
+from utils.file_manager import content_digest
+from utils.scheduler import DEFAULT_PLAN
+from utils.similarity import minhash, lsh_bands, estimate_similarity
+from utils.tracing import traced, mongo_event_listeners
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Heavy fields left out of idea listings
+IDEA_LIST_PROJECTION = {"pdf_report": 0, "txt_report": 0, "stage_outputs": 0, "minhash": 0, "lsh_bands": 0, "profile": 0}
+# Fields read to serve an idea's downloads, archived ideas keep theirs in report_archive
+IDEA_REPORTS_PROJECTION = {"pdf_report": 1, "txt_report": 1, "profile": 1, "archived": 1}
+
+# Collation of the username_case_insensitive index, username lookups use it to match
+# regardless of case while still being served by the index
+CASE_INSENSITIVE = {'locale': 'en', 'strength': 2}
+
+# Connections each MongoClient keeps open while idle, so a request after a quiet period
+# doesn't wait for a new connection and TLS handshake
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "4"))
+
+# MongoClient keeps its own connection pool, so one client per URI is shared
+# by every Database instance (and every Streamlit rerun) in the process
+_clients = {}
+_indexed_databases = set()
+_index_failures = {}  # database name -> monotonic time of the last failed index setup
+_clients_lock = threading.Lock()
+
+# Seconds before index setup is tried again after it failed
+INDEX_RETRY_SECONDS = 60
+
+def get_client(uri):
+    """Get the shared MongoClient for a connection string, connecting lazily"""
+    with _clients_lock:
+        if uri not in _clients:
+            _clients[uri] = MongoClient(uri, connect=False, minPoolSize=MONGO_MIN_POOL_SIZE,
+                                        event_listeners=mongo_event_listeners())
+        return _clients[uri]
+
+def user_search_filter(query):
+    """Prefix match on the lowercase username, name and email fields"""
+    if not query:
+        return {}
+    prefix = {"$regex": f"^{re.escape(query.lower())}"}
+    return {"$or": [
+        {"username_lower": prefix},
+        {"name_lower": prefix},
+        {"email_lower": prefix}
+    ]}
+
+def user_sort(sort_by, descending):
+    """Sort of the user list, the _id tie breaker follows the direction so one (field, _id) index serves both"""
+    direction = -1 if descending else 1
+    return [(sort_by, direction), ("_id", direction)]
+
+def user_updates(updates):
+    """Add the lowercase search fields of a changed name or email, a new password must be hashed already"""
+    if "name" in updates:
+        updates["name_lower"] = updates["name"].lower()
+    if "email" in updates:
+        updates["email_lower"] = updates["email"].lower()
+    return updates
+
+def similar_ideas_query(username, signature):
+    """Filter and projection of the user's ideas that share an LSH band with the signature"""
+    return (
+        {"username": username, "lsh_bands": {"$in": lsh_bands(signature)}},
+        {"pdf_report": 0, "txt_report": 0, "lsh_bands": 0}
+    )
+
+def most_similar(signature, candidates, threshold):
+    """The candidate whose estimated similarity is highest and at least threshold, None if there is none"""
+    best, best_score = None, threshold
+    for candidate in candidates:
+        score = estimate_similarity(signature, candidate.get("minhash"))
+        if score >= best_score:
+            best, best_score = candidate, score
+    if best:
+        best["similarity"] = best_score
+    return best
+
+def idea_reports(idea):
+    """The reports of an idea document or its unpacked archive, None when there is neither"""
+    if not idea:
+        return None
+    return {
+        "pdf_report": idea.get("pdf_report"),
+        "txt_report": idea.get("txt_report"),
+        "profile": idea.get("profile")
+    }
+
+def bulk_insert_errors(error, start=0):
+    """(document index, message) of the failed inserts of a BulkWriteError, offset by the batch start"""
+    return [
+        (start + write_error["index"],
+         "User already exists" if write_error.get("code") == 11000 else write_error.get("errmsg", "Write failed"))
+        for write_error in error.details.get("writeErrors", [])
+    ]
+
 class Database:
     def __init__(self):
         load_dotenv()  # Load environment variables
-        self.client = MongoClient(os.getenv("MONGODB_URI"))
-        self.db = self.client.business_builder
+        self.client = get_client(os.getenv("MONGODB_URI"))
+        self.db = self.client[os.getenv("MONGODB_DB", "business_builder")]
         self.users = self.db.users
         self.business_ideas = self.db.business_ideas  # New collection
-        self.setup_indexes()
+        self.rate_limits = self.db.rate_limits
+        self.analytics_daily = self.db.analytics_daily
+        self.analytics_state = self.db.analytics_state
+        self.run_status = self.db.run_status
+        self.report_archive = self.db.report_archive  # Compressed reports of old ideas
+        self.translation_cache = self.db.translation_cache
+
+        # Index setup takes several round trips, run it once per process.
+        # After a failure it is retried by a later Database, at most once per INDEX_RETRY_SECONDS
+        if self.db.name not in _indexed_databases and \
+                time.monotonic() - _index_failures.get(self.db.name, -INDEX_RETRY_SECONDS) >= INDEX_RETRY_SECONDS:
+            if self.setup_indexes():
+                _indexed_databases.add(self.db.name)
+                # Migrations backfill whole collections, they must not hold up the page creating this Database
+                migrate_in_background(self.db)
+            else:
+                _index_failures[self.db.name] = time.monotonic()
 
     def setup_indexes(self):
-        """Create necessary indexes"""
+        """Create necessary indexes, returns whether all succeeded"""
         try:
             # Existing indexes for users collection
             existing_indexes = self.users.list_indexes()
@@ -30,7 +147,7 @@ class Database:
                 self.users.create_index(
                     [("username", 1)],
                     unique=True,
-                    collation={'locale': 'en', 'strength': 2},
+                    collation=CASE_INSENSITIVE,
                     name="username_case_insensitive"
                 )
             
@@ -41,39 +158,69 @@ class Database:
                     name="email_unique"
                 )
 
+            # Prefix search in user management, sort indexes are added by the migrations
+            for field in ("username_lower", "name_lower", "email_lower"):
+                self.users.create_index([(field, 1)])
+            self.index_missing_search_fields()
+
             # New indexes for business_ideas collection
             self.business_ideas.create_index([("username", 1), ("created_at", -1)])
             self.business_ideas.create_index([("idea_id", 1)], unique=True)
+            self.business_ideas.create_index([("username", 1), ("lsh_bands", 1)])
+
+            # Ideas are aggregated for analytics in created_at order
+            self.business_ideas.create_index([("created_at", 1)])
+            self.analytics_daily.create_index([("day", 1)])
+
+            # Rate limit windows and lockouts expire on their own
+            self.rate_limits.create_index("expires_at", expireAfterSeconds=0)
+            self.rate_limits.create_index("key")
+
+            # Reattaching to a user's latest run, run documents are kept for a week
+            self.run_status.create_index([("username", 1), ("updated_at", -1)])
+            self.run_status.create_index("started_at", expireAfterSeconds=7 * 24 * 3600)
+
+            # Archived reports are read back one idea at a time
+            self.report_archive.create_index([("idea_id", 1)], unique=True)
+
+            # Cached translations of agent outputs expire after 90 days
+            self.translation_cache.create_index("created_at", expireAfterSeconds=90 * 24 * 3600)
+
+            # Index changes since are versioned migrations, see utils.migrations
+            return True
 
         except Exception as e:
             logger.error(f"Error setting up indexes: {e}")
+            return False
 
-    def save_business_idea(self, username, idea_text, pdf_data, txt_data, language):
+    @traced("save_business_idea")
+    def save_business_idea(self, username, idea_text, pdf_data, txt_data, language, stage_outputs=None, stage_timings=None, idea_id=None, profile=None, stage_usage=None, prompt_version=None):
         """Save a business idea and its generated reports"""
         try:
-            idea_id = str(ObjectId())  # Generate a unique ID
-            idea_doc = {
-                "idea_id": idea_id,
-                "username": username,
-                "idea_text": idea_text,
-                "language": language,
-                "created_at": datetime.utcnow(),
-                "pdf_report": pdf_data,
-                "txt_report": txt_data
-            }
+            idea_doc = self.idea_document(username, idea_text, pdf_data, txt_data, language, stage_outputs,
+                                          stage_timings, idea_id, profile, stage_usage, prompt_version)
             self.business_ideas.insert_one(idea_doc)
             logger.info(f"Business idea saved for user {username}")
-            return idea_id
+            return idea_doc["idea_id"]
         except Exception as e:
             logger.error(f"Error saving business idea for user {username}: {e}")
             raise
 
+    def find_similar_idea(self, username, idea_text, threshold=0.7):
+        """Find the most similar earlier idea of a user, using the LSH band index"""
+        try:
+            signature = minhash(idea_text)
+            return most_similar(signature, self.business_ideas.find(*similar_ideas_query(username, signature)), threshold)
+        except Exception as e:
+            logger.error(f"Error finding similar ideas for user {username}: {e}")
+            return None
+
     def get_user_ideas(self, username):
         """Get all business ideas for a specific user"""
         try:
             return list(self.business_ideas.find(
                 {"username": username},
-                {"pdf_report": 0, "txt_report": 0}  # Exclude binary data
+                IDEA_LIST_PROJECTION  # Exclude binary data
             ).sort("created_at", -1))
         except Exception as e:
             logger.error(f"Error getting ideas for user {username}: {e}")
@@ -84,7 +231,7 @@ class Database:
         try:
             return list(self.business_ideas.find(
                 {},
-                {"pdf_report": 0, "txt_report": 0}  # Exclude binary data
+                IDEA_LIST_PROJECTION  # Exclude binary data
             ).sort("created_at", -1))
         except Exception as e:
             logger.error(f"Error getting all ideas: {e}")
@@ -93,45 +240,132 @@ class Database:
     def get_idea_reports(self, idea_id):
         """Get reports for a specific business idea"""
         try:
-            idea = self.business_ideas.find_one({"idea_id": idea_id})
-            if idea:
-                return {
-                    "pdf_report": idea.get("pdf_report"),
-                    "txt_report": idea.get("txt_report")
-                }
-            return None
+            idea = self.business_ideas.find_one({"idea_id": idea_id}, IDEA_REPORTS_PROJECTION)
+            if idea and idea.get("archived"):
+                idea = unpack_reports(self.report_archive.find_one({"idea_id": idea_id}))
+            return idea_reports(idea)
         except Exception as e:
             logger.error(f"Error getting reports for idea {idea_id}: {e}")
             return None
 
+    def has_idea(self, idea_id):
+        """Whether an idea has been saved, without reading its reports"""
+        try:
+            return self.business_ideas.count_documents({"idea_id": idea_id}, limit=1) > 0
+        except Exception as e:
+            logger.error(f"Error checking idea {idea_id}: {e}")
+            return False
+
     def get_multiple_reports(self, idea_ids):
         """Get reports for multiple business ideas"""
         try:
-            return list(self.business_ideas.find(
+            reports = list(self.business_ideas.find(
                 {"idea_id": {"$in": idea_ids}},
-                {"idea_id": 1, "pdf_report": 1, "txt_report": 1}
+                {"idea_id": 1, "pdf_report": 1, "txt_report": 1, "archived": 1}
             ))
+            archived = [report["idea_id"] for report in reports if report.get("archived")]
+            if archived:
+                archives = {archive["idea_id"]: archive for archive in self.report_archive.find({"idea_id": {"$in": archived}})}
+                for report in reports:
+                    if report.get("archived"):
+                        report.update(unpack_reports(archives.get(report["idea_id"])))
+            return reports
         except Exception as e:
             logger.error(f"Error getting multiple reports: {e}")
             return []
 
-    def create_user(self, username, password, email, name, credits=5, is_admin=False):
+    def get_cached_translation(self, key):
+        """Cached translation of an agent output, None when it has not been translated before"""
+        try:
+            cached = self.translation_cache.find_one({"_id": key}, {"text": 1})
+            return cached["text"] if cached else None
+        except Exception as e:
+            logger.error(f"Error reading cached translation {key}: {e}")
+            return None
+
+    def cache_translation(self, key, language, text):
+        try:
+            self.translation_cache.replace_one({"_id": key}, self.translation_document(key, language, text), upsert=True)
+        except Exception as e:
+            # The translation is still used, only the next run pays for it again
+            logger.warning(f"Error caching translation {key}: {e}")
+
+    @staticmethod
+    def idea_document(username, idea_text, pdf_data, txt_data, language, stage_outputs=None, stage_timings=None, idea_id=None, profile=None, stage_usage=None, prompt_version=None):
+        """Build a business idea document with its reports, report digests and similarity signature"""
+        signature = minhash(idea_text)
+        idea_doc = {
+            "idea_id": idea_id or str(ObjectId()),  # Generate a unique ID
+            "username": username,
+            "idea_text": idea_text,
+            "language": language,
+            "created_at": datetime.utcnow(),
+            "pdf_report": pdf_data,
+            "txt_report": txt_data,
+            "stage_outputs": stage_outputs,
+            "stage_timings": stage_timings,
+            "stage_usage": stage_usage,
+            "prompt_version": prompt_version,
+            # Digests let listings serve downloads from the artifact store without the blobs
+            "artifacts": {"pdf": content_digest(pdf_data), "txt": content_digest(txt_data), "profile": content_digest(profile)},
+            "minhash": signature,
+            "lsh_bands": lsh_bands(signature),
+            # Set explicitly, the archival job's partial index only covers archived: false
+            "archived": False
+        }
+        if profile:
+            idea_doc["profile"] = profile
+        return idea_doc
+
+    @staticmethod
+    def translation_document(key, language, text):
+        return {"_id": key, "language": language, "text": text, "created_at": datetime.utcnow()}
+
+    @staticmethod
+    def user_document(username, hashed_password, email, name, credits=5, is_admin=False, plan=DEFAULT_PLAN):
+        """Build a user document from an already hashed password"""
+        return {
+            "username": username,  # Keep original case for display
+            "username_lower": username.lower(),  # Store lowercase for searching
+            "name_lower": name.lower(),
+            "email_lower": email.lower(),
+            "password": hashed_password,
+            "email": email,
+            "name": name,
+            "credits": credits,
+            "is_admin": is_admin,
+            "plan": plan,  # Scheduling weight and best-of-N, see utils.scheduler.PLAN_WEIGHTS
+            "created_at": datetime.utcnow(),
+            "last_login": None
+        }
+
+    def create_users_bulk(self, user_documents, batch_size=1000):
+        """
+        Insert many users, continuing past duplicates
+        Returns: (number inserted, [(document index, error message)])
+        """
+        inserted = 0
+        errors = []
+        for start in range(0, len(user_documents), batch_size):
+            batch = user_documents[start:start + batch_size]
+            try:
+                result = self.users.insert_many(batch, ordered=False)
+                inserted += len(result.inserted_ids)
+            except BulkWriteError as e:
+                inserted += e.details.get("nInserted", 0)
+                errors.extend(bulk_insert_errors(e, start))
+            except Exception as e:
+                logger.error(f"Error inserting users in bulk: {e}")
+                errors.extend((start + i, str(e)) for i in range(len(batch)))
+        logger.info(f"Bulk created {inserted} users")
+        return inserted, errors
+
+    def create_user(self, username, password, email, name, credits=5, is_admin=False, plan=DEFAULT_PLAN):
         """Create a new user"""
         try:
             logger.info(f"Creating user: {username}")
             hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-            user = {
-                "username": username,  # Keep original case for display
-                "username_lower": username.lower(),  # Store lowercase for searching
-                "password": hashed,
-                "email": email,
-                "name": name,
-                "credits": credits,
-                "is_admin": is_admin,
-                "created_at": datetime.utcnow(),
-                "last_login": None
-            }
-            self.users.insert_one(user)
+            self.users.insert_one(self.user_document(username, hashed, email, name, credits, is_admin, plan))
             logger.info(f"User created successfully: {username}")
             return True
         except Exception as e:
@@ -144,8 +378,8 @@ class Database:
             logger.info(f"Verifying user: {username}")
             # Search case-insensitive
             user = self.users.find_one(
-                {"username": {"$regex": f"^{username}$", "$options": "i"}},
-                collation={'locale': 'en', 'strength': 2}
+                {"username": username},
+                collation=CASE_INSENSITIVE
             )
             
             if not user:
@@ -173,8 +407,8 @@ class Database:
         """Get user by username"""
         try:
             return self.users.find_one(
-                {"username": {"$regex": f"^{username}$", "$options": "i"}},
-                collation={'locale': 'en', 'strength': 2}
+                {"username": username},
+                collation=CASE_INSENSITIVE
             )
         except Exception as e:
             logger.error(f"Error getting user {username}: {e}")
@@ -184,9 +418,9 @@ class Database:
         """Update user credits"""
         try:
             self.users.update_one(
-                {"username": {"$regex": f"^{username}$", "$options": "i"}},
+                {"username": username},
                 {"$set": {"credits": credits}},
-                collation={'locale': 'en', 'strength': 2}
+                collation=CASE_INSENSITIVE
             )
             logger.info(f"Credits updated for user {username}: {credits}")
             return True
@@ -194,6 +428,38 @@ class Database:
             logger.error(f"Error updating credits for user {username}: {e}")
             return False
 
+    def search_users(self, query="", sort_by="created_at", descending=True, page=0, page_size=25):
+        """
+        Search users by username, name or email prefix, one page at a time
+        Returns: (users, total)
+        """
+        try:
+            filter_ = user_search_filter(query)
+            total = self.users.count_documents(filter_)
+            users = list(self.users.find(filter_, {"password": 0})
+                         .sort(user_sort(sort_by, descending))
+                         .skip(page * page_size)
+                         .limit(page_size))
+            return users, total
+        except Exception as e:
+            logger.error(f"Error searching users: {e}")
+            return [], 0
+
+    def index_missing_search_fields(self):
+        """Add lowercase search fields to users created before they were introduced"""
+        try:
+            for user in self.users.find({"name_lower": {"$exists": False}}, {"username": 1, "name": 1, "email": 1}):
+                self.users.update_one(
+                    {"_id": user["_id"]},
+                    {"$set": {
+                        "username_lower": user["username"].lower(),
+                        "name_lower": user.get("name", "").lower(),
+                        "email_lower": user.get("email", "").lower()
+                    }}
+                )
+        except Exception as e:
+            logger.error(f"Error adding user search fields: {e}")
+
     def list_users(self):
         """List all users"""
         try:
@@ -206,8 +472,8 @@ class Database:
         """Delete a user"""
         try:
             self.users.delete_one(
-                {"username": {"$regex": f"^{username}$", "$options": "i"}},
-                collation={'locale': 'en', 'strength': 2}
+                {"username": username},
+                collation=CASE_INSENSITIVE
             )
             logger.info(f"User deleted: {username}")
             return True
@@ -221,9 +487,9 @@ class Database:
             if "password" in updates:
                 updates["password"] = bcrypt.hashpw(updates["password"].encode('utf-8'), bcrypt.gensalt())
             self.users.update_one(
-                {"username": {"$regex": f"^{username}$", "$options": "i"}},
-                {"$set": updates},
-                collation={'locale': 'en', 'strength': 2}
+                {"username": username},
+                {"$set": user_updates(updates)},
+                collation=CASE_INSENSITIVE
             )
             logger.info(f"User updated: {username}")
             return True
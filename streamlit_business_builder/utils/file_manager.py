@@ -1,36 +1,143 @@
+import hashlib
+import logging
 import os
-from datetime import datetime
-import re
+import threading
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Evicting scans the whole store, don't do it on every write
+EVICT_INTERVAL = 60.0
+
+
+class ReportNotFound(FileNotFoundError):
+    """A report is neither in the store nor in MongoDB"""
+
+
+def content_digest(data) -> Optional[str]:
+    """SHA-256 of a report, the name it is stored under"""
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
 
 class FileManager:
-    def __init__(self):
-        # Create base directories if they don't exist
-        self.base_dir = "generated_files"
-        self.create_directories()
-
-    def create_directories(self):
-        """Create necessary directories if they don't exist"""
-        directories = [
-            self.base_dir,
-            os.path.join(self.base_dir, "txt"),
-            os.path.join(self.base_dir, "pdf")
-        ]
-        for directory in directories:
-            if not os.path.exists(directory):
-                os.makedirs(directory)
-
-    def generate_filename(self, username, extension):
-        """Generate filename with username and timestamp"""
-        # Get current timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Create simple filename
-        filename = f"{username}_{timestamp}.{extension}"
-        
-        # Determine full path based on extension
-        if extension == "txt":
-            full_path = os.path.join(self.base_dir, "txt", filename)
+    """
+    Content-addressed store for report files under generated_files/artifacts.
+    Files are named by the SHA-256 of their content, so a page only has to keep the digest
+    of a report to serve it and identical reports are stored once. Reading a file marks it
+    as recently used; the least recently used files are evicted once the store grows past
+    max_bytes, and files unused for longer than max_age are removed.
+    """
+
+    def __init__(self, base_dir: str = os.path.join("generated_files", "artifacts"),
+                 max_bytes: int = 500 * 1024 * 1024, max_age: float = 7 * 24 * 3600):
+        # Absolute, a later chdir must not move the store
+        self.base_dir = os.path.abspath(base_dir)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._last_evict = 0.0
+        self._lock = threading.Lock()
+        os.makedirs(self.base_dir, exist_ok=True)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.base_dir, digest)
+
+    def put(self, data) -> str:
+        """Store a report, returns its digest"""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        digest = content_digest(data)
+        path = self.path(digest)
+        if os.path.exists(path):
+            os.utime(path)
         else:
-            full_path = os.path.join(self.base_dir, "pdf", filename)
-            
-        return full_path 
\ No newline at end of file
+            # Write under a temporary name, readers never see a partial file
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        self._maybe_evict()
+        return digest
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """Contents of a stored report, None when it is not (or no longer) in the store"""
+        path = self.path(digest)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+
+    def deferred(self, digest: Optional[str], load: Callable[[], object]) -> Callable[[], bytes]:
+        """
+        Data for st.download_button that is only read when the button is clicked:
+        from the store, or from `load()` when it is missing, storing it for next time.
+        Raises ReportNotFound when `load()` has nothing either, rather than serving an empty file.
+        """
+        def read():
+            data = self.get(digest) if digest else None
+            if data is None:
+                data = load()
+                if data is None:
+                    raise ReportNotFound(f"Report {digest or ''} is no longer available")
+                self.put(data)
+            return data
+        return read
+
+    def _maybe_evict(self):
+        with self._lock:
+            if time.monotonic() - self._last_evict < EVICT_INTERVAL:
+                return
+            self._last_evict = time.monotonic()
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove expired files, then the least recently used until the store fits, returns the number removed"""
+        removed = 0
+        try:
+            now = time.time()
+            files = []
+            with os.scandir(self.base_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and not entry.name.endswith(".tmp"):
+                        stat = entry.stat()
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+            files.sort()
+            total = sum(size for _, size, _ in files)
+            for mtime, size, path in files:
+                if now - mtime <= self.max_age and total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed += 1
+            if removed:
+                logger.info(f"Evicted {removed} files from the artifact store")
+        except Exception as e:
+            logger.error(f"Error evicting artifacts: {e}")
+        return removed
+
+
+_file_manager = None
+_file_manager_lock = threading.Lock()
+
+
+def get_file_manager() -> FileManager:
+    """Process-wide artifact store"""
+    global _file_manager
+    with _file_manager_lock:
+        if _file_manager is None:
+            _file_manager = FileManager(
+                os.getenv("ARTIFACT_DIR", os.path.join("generated_files", "artifacts")),
+                max_bytes=int(os.getenv("ARTIFACT_MAX_MB", "500")) * 1024 * 1024,
+                max_age=float(os.getenv("ARTIFACT_MAX_AGE_DAYS", "7")) * 24 * 3600
+            )
+        return _file_manager
@@ -0,0 +1,220 @@
+"""
+Versioned index and schema migrations. Each migration runs once per database, in version order,
+and is recorded in the schema_migrations collection. To change an index, add a new version
+rather than editing an old one.
+
+    python -m utils.migrations           # apply pending migrations, as a deploy step
+    python -m utils.migrations --status  # list applied and pending migrations
+
+Backfills scan whole collections, so they don't run while a page waits: either the deploy step
+applies them, or with MIGRATE_ON_START the app does on a background thread. A lease in the
+migration_lock collection keeps processes from applying them at the same time; migrations must
+still be safe to run twice, a lease that expired mid-run can be taken over.
+"""
+import argparse
+import logging
+import os
+import socket
+import sys
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from utils.archive import unpack_reports
+from utils.file_manager import content_digest
+from utils.similarity import lsh_bands, minhash
+
+logger = logging.getLogger(__name__)
+
+
+# Apply pending migrations from the app, off for deployments that run them as a deploy step
+MIGRATE_ON_START = os.getenv("MIGRATE_ON_START", "true").lower() == "true"
+# Seconds a process may hold the migration lease, longer than the slowest backfill
+LOCK_SECONDS = int(os.getenv("MIGRATION_LOCK_SECONDS", "3600"))
+
+_started = set()
+_started_lock = threading.Lock()
+
+
+class MigrationError(Exception):
+    """A migration failed, later ones were not applied"""
+
+# Fields the user list can be sorted on
+USER_SORT_FIELDS = ("created_at", "last_login", "credits")
+
+
+def _drop_index(collection, name):
+    try:
+        collection.drop_index(name)
+    except OperationFailure:
+        # Never created on this database
+        pass
+
+
+def _user_sort_indexes(db):
+    # The user list sorts on (field, _id); a single-field index leaves the _id tie breaker
+    # to an in-memory sort of every user
+    for field in USER_SORT_FIELDS:
+        db.users.create_index([(field, 1), ("_id", 1)])
+        _drop_index(db.users, f"{field}_1")
+
+
+def _archive_scan_index(db):
+    # The archival job walks old ideas that still hold their reports, archived stubs drop out of the index.
+    # Partial indexes can't filter on a missing field, so ideas saved before the flag existed get archived: false
+    db.business_ideas.update_many({"archived": {"$exists": False}}, {"$set": {"archived": False}})
+    db.business_ideas.create_index(
+        [("created_at", 1)],
+        name="created_at_unarchived",
+        partialFilterExpression={"archived": False}
+    )
+
+
+def _backfill_signatures(db):
+    # Ideas saved before similarity signatures existed could never match as near-duplicates
+    for idea in db.business_ideas.find({"minhash": {"$exists": False}}, {"idea_text": 1}):
+        signature = minhash(idea.get("idea_text", ""))
+        db.business_ideas.update_one(
+            {"_id": idea["_id"]},
+            {"$set": {"minhash": signature, "lsh_bands": lsh_bands(signature)}}
+        )
+
+
+def _backfill_artifact_digests(db):
+    # The report history only offers downloads of reports with a digest
+    fields = {"pdf": "pdf_report", "txt": "txt_report", "profile": "profile"}
+    for idea in db.business_ideas.find({"artifacts": {"$exists": False}},
+                                       {"idea_id": 1, "archived": 1, **{field: 1 for field in fields.values()}}):
+        reports = idea
+        if idea.get("archived"):
+            reports = unpack_reports(db.report_archive.find_one({"idea_id": idea["idea_id"]}))
+        db.business_ideas.update_one(
+            {"_id": idea["_id"]},
+            {"$set": {"artifacts": {kind: content_digest(reports.get(field)) for kind, field in fields.items()}}}
+        )
+
+
+MIGRATIONS = [
+    (1, "Compound (field, _id) indexes for sorting the user list", _user_sort_indexes),
+    (2, "Partial created_at index over ideas that are not archived", _archive_scan_index),
+    # Version 3 created the translation cache TTL index, Database.setup_indexes creates it now so it
+    # doesn't wait on earlier migrations. Don't reuse the number, databases may have it recorded
+    (4, "Similarity signatures for ideas saved before they existed", _backfill_signatures),
+    (5, "Report digests for ideas saved before the artifact store", _backfill_artifact_digests),
+]
+
+
+def applied_versions(db) -> set:
+    return {doc["_id"] for doc in db.schema_migrations.find({}, {"_id": 1})}
+
+
+def _acquire_lock(db, owner) -> bool:
+    """Take the migration lease unless another process holds one that hasn't expired"""
+    now = datetime.utcnow()
+    try:
+        db.migration_lock.update_one(
+            {"_id": "migrations", "expires_at": {"$lt": now}},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=LOCK_SECONDS)}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        # The lease exists and hasn't expired, so the upsert tried to insert a second one
+        return False
+
+
+def _release_lock(db, owner):
+    db.migration_lock.delete_one({"_id": "migrations", "owner": owner})
+
+
+def migrate(db) -> list:
+    """
+    Apply pending migrations to a pymongo database in order, returns the versions applied.
+    Returns none when another process holds the migration lease.
+    Stops at the first migration that fails and raises MigrationError, it is retried on the next run.
+    """
+    applied = applied_versions(db)
+    if all(version in applied for version, _, _ in MIGRATIONS):
+        return []
+    owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    if not _acquire_lock(db, owner):
+        logger.info("Migrations are being applied by another process")
+        return []
+    try:
+        return _apply_pending(db, applied_versions(db))
+    finally:
+        _release_lock(db, owner)
+
+
+def _apply_pending(db, applied) -> list:
+    done = []
+    for version, description, apply in MIGRATIONS:
+        if version in applied:
+            continue
+        logger.info(f"Applying migration {version}: {description}")
+        try:
+            apply(db)
+        except Exception as e:
+            logger.error(f"Migration {version} ({description}) failed, later migrations not applied: {e}")
+            raise MigrationError(f"Migration {version} failed: {e}") from e
+        try:
+            db.schema_migrations.insert_one({"_id": version, "description": description, "applied_at": datetime.utcnow()})
+        except DuplicateKeyError:
+            # Applied by another replica in the meantime
+            pass
+        done.append(version)
+    return done
+
+
+def migrate_in_background(db) -> bool:
+    """
+    Apply pending migrations on a daemon thread, once per database and process.
+    Returns False when disabled with MIGRATE_ON_START or already started.
+    """
+    with _started_lock:
+        if not MIGRATE_ON_START or db.name in _started:
+            return False
+        _started.add(db.name)
+
+    def run():
+        try:
+            migrate(db)
+        except MigrationError:
+            # Logged by migrate, the next process start retries it
+            pass
+        except Exception as e:
+            logger.error(f"Error applying migrations: {e}")
+
+    threading.Thread(target=run, name="migrations", daemon=True).start()
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned database migrations")
+    parser.add_argument("--status", action="store_true", help="List migrations without applying them")
+    args = parser.parse_args()
+
+    from utils.database import get_client
+
+    load_dotenv()
+    db = get_client(os.getenv("MONGODB_URI"))[os.getenv("MONGODB_DB", "business_builder")]
+    failed = False
+    if not args.status:
+        try:
+            migrate(db)
+        except MigrationError:
+            # Logged by migrate, the status below shows where it stopped
+            failed = True
+    applied = applied_versions(db)
+    for version, description, _ in MIGRATIONS:
+        print(f"{'applied' if version in applied else 'pending':<8} {version:>3}  {description}")
+    # Pending ones left after applying means another process holds the lease, a deploy shouldn't go ahead yet
+    pending = any(version not in applied for version, _, _ in MIGRATIONS)
+    sys.exit(1 if failed or pending and not args.status else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from collections import deque
+from statistics import median
+from typing import Callable, Dict, List, Tuple
+
+from utils.client_pool import PoolExhausted
+
+logger = logging.getLogger(__name__)
+
+
+class RouteStats:
+    """Rolling latency and error rate of one route for one agent stage"""
+
+    def __init__(self, window: int):
+        self.calls = deque(maxlen=window)  # (seconds, succeeded)
+        self.unhealthy_until = 0.0
+        self.last_call = 0.0
+
+    def latency(self):
+        latencies = [seconds for seconds, ok in self.calls if ok]
+        return median(latencies) if latencies else None
+
+    def error_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for _, ok in self.calls if not ok) / len(self.calls)
+
+
+class ModelRouter:
+    """
+    Sends each agent call to the fastest healthy route that meets the stage's quality tier,
+    falling back to the next route when a call fails.
+
+    routes: {name: {"endpoint": ..., "model": ..., "tier": int}}
+    agent_routing: {agent_type: {"min_tier": int, "routes": [name, ...]}}, routes in order of preference
+    """
+
+    def __init__(self, routes: Dict[str, dict], agent_routing: Dict[str, dict], window: int = 20,
+                 max_error_rate: float = 0.5, min_samples: int = 3, cooldown: float = 60.0):
+        self.routes = routes
+        self.agent_routing = agent_routing
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _route_stats(self, agent_type, name) -> RouteStats:
+        key = (agent_type, name)
+        if key not in self._stats:
+            self._stats[key] = RouteStats(self.window)
+        return self._stats[key]
+
+    def candidates(self, agent_type) -> List[str]:
+        """
+        Routes to try for a stage, in order. Unmeasured routes preferred over every measured
+        one are probed first, then measured routes go fastest first, then the rest.
+        """
+        routing = self.agent_routing[agent_type]
+        eligible = [name for name in routing["routes"] if self.routes[name]["tier"] >= routing["min_tier"]]
+        now = time.monotonic()
+        probe, measured, rest, unhealthy = [], [], [], []
+        with self._lock:
+            for name in eligible:
+                stats = self._route_stats(agent_type, name)
+                if stats.unhealthy_until > now:
+                    unhealthy.append(name)
+                    continue
+                if stats.calls and now - stats.last_call > self.cooldown:
+                    # Measurements this old say little about the route today
+                    stats.calls.clear()
+                latency = stats.latency()
+                if latency is not None:
+                    measured.append((latency, name))
+                elif not stats.calls and not measured:
+                    probe.append(name)
+                else:
+                    rest.append(name)
+        # Unhealthy routes stay as a last resort rather than failing the call outright
+        return probe + [name for _, name in sorted(measured)] + rest + unhealthy
+
+    def record(self, agent_type, name, seconds, ok):
+        with self._lock:
+            stats = self._route_stats(agent_type, name)
+            stats.calls.append((seconds, ok))
+            stats.last_call = time.monotonic()
+            if len(stats.calls) >= self.min_samples and stats.error_rate() > self.max_error_rate:
+                logger.warning(f"Route {name} marked unhealthy for {agent_type} calls")
+                stats.unhealthy_until = time.monotonic() + self.cooldown
+                # Start over after the cooldown, so a single probe can bring the route back
+                stats.calls.clear()
+
+    def call(self, agent_type, request: Callable[[dict], object]) -> Tuple[str, object]:
+        """
+        Call `request(route)` on the best route, falling back to the next on errors
+        Returns: (route name, result)
+        """
+        last_error = None
+        for name in self.candidates(agent_type):
+            started = time.perf_counter()
+            try:
+                result = request(self.routes[name])
+            except PoolExhausted as e:
+                # No API key can take the call right now, that says nothing about the route's health.
+                # A route on another endpoint may still have keys
+                logger.warning(f"Route {name} has no API key available for {agent_type} agent: {e}")
+                last_error = e
+                continue
+            except Exception as e:
+                self.record(agent_type, name, time.perf_counter() - started, False)
+                logger.warning(f"Route {name} failed for {agent_type} agent: {e}")
+                last_error = e
+                continue
+            self.record(agent_type, name, time.perf_counter() - started, True)
+            return name, result
+        if last_error is None:
+            raise ValueError(f"No route configured for {agent_type} agent")
+        raise last_error
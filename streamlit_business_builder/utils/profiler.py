@@ -0,0 +1,90 @@
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc is process wide: count the running profilers and stop it when the last one finishes
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_started_tracemalloc = False
+
+
+class RunProfiler:
+    """
+    cProfile and tracemalloc around a single analysis run, for admins chasing a slow report.
+    cProfile only sees the thread that started it; tracemalloc is process wide,
+    so allocations of other sessions running at the same time show up as well.
+    """
+
+    def __init__(self, top=40):
+        self.top = top
+        self._profile = cProfile.Profile()
+        self._running = False
+        self._started = None
+        self._snapshot = None
+
+    def start(self):
+        global _tracing_users, _started_tracemalloc
+        try:
+            self._profile.enable()
+        except ValueError as e:
+            # Only one profiler can be active per process
+            logger.warning(f"Profiler not started: {e}")
+            return self
+        with _tracing_lock:
+            if _tracing_users == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                _started_tracemalloc = True
+            _tracing_users += 1
+            tracemalloc.reset_peak()
+            self._snapshot = tracemalloc.take_snapshot()
+        self._started = time.perf_counter()
+        self._running = True
+        return self
+
+    def stop(self):
+        """
+        Stop profiling and return the report as text, None if profiling never started or failed.
+        Never raises, the profile must not fail the run it describes.
+        """
+        global _tracing_users, _started_tracemalloc
+        if not self._running:
+            return None
+        self._running = False
+        elapsed = time.perf_counter() - self._started
+        try:
+            self._profile.disable()
+            with _tracing_lock:
+                try:
+                    current, peak = tracemalloc.get_traced_memory()
+                    allocations = tracemalloc.take_snapshot().compare_to(self._snapshot, "lineno")
+                finally:
+                    _tracing_users -= 1
+                    if _tracing_users == 0 and _started_tracemalloc:
+                        tracemalloc.stop()
+                        _started_tracemalloc = False
+            return self._report(elapsed, peak, allocations)
+        except Exception as e:
+            logger.error(f"Error creating run profile: {e}")
+            return None
+
+    def _report(self, elapsed, peak, allocations):
+        out = io.StringIO()
+        out.write(f"Wall time: {elapsed:.2f} s\n")
+        out.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MiB\n\n")
+
+        stats = pstats.Stats(self._profile, stream=out)
+        out.write("=== Functions by cumulative time ===\n")
+        stats.sort_stats("cumulative").print_stats(self.top)
+        out.write("=== PDF rendering by own time ===\n")
+        stats.sort_stats("tottime").print_stats("pdf_generator|reportlab", self.top)
+
+        out.write("=== Allocations during the run ===\n")
+        for stat in allocations[:self.top]:
+            out.write(f"{stat}\n")
+        return out.getvalue()
@@ -0,0 +1,175 @@
+"""
+Explain every query shape of the Database layer and flag collection scans and in-memory sorts.
+
+    python -m utils.query_audit --seed   # seed the configured database with sample data first
+
+Point MONGODB_URI/MONGODB_DB at a local scratch database: --seed inserts sample users and ideas,
+since plans on empty collections say nothing. Exits with status 1 when a query needs an index;
+the suggested index belongs in a new migration in utils/migrations.py.
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from utils import migrations
+from utils.database import CASE_INSENSITIVE, IDEA_LIST_PROJECTION, Database, user_search_filter, user_sort
+
+RANGE_OPERATORS = ("$lt", "$lte", "$gt", "$gte", "$ne", "$exists", "$regex", "$nin")
+SAMPLE_USER = "user1"
+SAMPLE_IDEA_ID = "000000000000000000000001"
+
+
+def _shape(name, collection, filter_, sort=None, projection=None, collation=None, limit=0,
+           allow_scan=False, allow_sort=False):
+    return {"name": name, "collection": collection, "filter": filter_, "sort": sort, "projection": projection,
+            "collation": collation, "limit": limit, "allow_scan": allow_scan, "allow_sort": allow_sort}
+
+
+# Updates and deletes select documents like a find with the same filter and collation
+QUERY_SHAPES = [
+    _shape("find_similar_idea", "business_ideas", {"username": SAMPLE_USER, "lsh_bands": {"$in": ["0:0", "1:0"]}}),
+    # Migration 4, a one-off backfill of ideas saved before signatures existed
+    _shape("backfill_signatures", "business_ideas", {"minhash": {"$exists": False}}, allow_scan=True),
+    _shape("get_user_ideas", "business_ideas", {"username": SAMPLE_USER}, sort=[("created_at", -1)],
+           projection=IDEA_LIST_PROJECTION),
+    _shape("get_all_ideas", "business_ideas", {}, sort=[("created_at", -1)], projection=IDEA_LIST_PROJECTION),
+    _shape("get_idea_reports", "business_ideas", {"idea_id": SAMPLE_IDEA_ID}),
+    _shape("get_idea_reports[archived]", "report_archive", {"idea_id": SAMPLE_IDEA_ID}),
+    _shape("get_multiple_reports", "business_ideas", {"idea_id": {"$in": [SAMPLE_IDEA_ID]}}),
+    _shape("archive_old_reports", "business_ideas",
+           {"created_at": {"$lt": datetime.utcnow() - timedelta(days=180)}, "archived": False},
+           sort=[("created_at", 1)]),
+    _shape("get_user", "users", {"username": SAMPLE_USER}, collation=CASE_INSENSITIVE),
+    _shape("search_users[all]", "users", {}, sort=user_sort("created_at", True), limit=25),
+    _shape("search_users[credits asc]", "users", {}, sort=user_sort("credits", False), limit=25),
+    _shape("search_users[last_login]", "users", {}, sort=user_sort("last_login", True), limit=25),
+    # Prefix matches are merged from three indexes and sorted, bounded by the page size
+    _shape("search_users[prefix]", "users", user_search_filter("user1"), sort=user_sort("created_at", True),
+           limit=25, allow_sort=True),
+    _shape("index_missing_search_fields", "users", {"name_lower": {"$exists": False}}),
+    # The admin page lists every user
+    _shape("list_users", "users", {}, projection={"password": 0}, allow_scan=True),
+]
+
+
+def plan_stages(plan) -> List[str]:
+    """Stage names of a winning plan, classic and slot based engine explain formats alike"""
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for key, value in plan.items():
+            if key != "slotBasedPlan":
+                stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+
+def plan_indexes(plan) -> List[str]:
+    if isinstance(plan, dict):
+        names = [plan["indexName"]] if "indexName" in plan else []
+        return names + [name for value in plan.values() for name in plan_indexes(value)]
+    if isinstance(plan, list):
+        return [name for item in plan for name in plan_indexes(item)]
+    return []
+
+
+def suggest_index(shape) -> list:
+    """Index keys for a shape by the equality, sort, range rule"""
+    equality, ranges = [], []
+    for field, condition in shape["filter"].items():
+        if field.startswith("$"):
+            continue
+        if isinstance(condition, dict) and any(op in condition for op in RANGE_OPERATORS):
+            ranges.append(field)
+        else:
+            equality.append(field)
+    keys = [(field, 1) for field in equality]
+    keys += [(field, direction) for field, direction in shape["sort"] or [] if field not in equality]
+    keys += [(field, 1) for field in ranges if field not in dict(keys)]
+    return keys
+
+
+def explain(db, shape) -> dict:
+    cursor = db.db[shape["collection"]].find(shape["filter"], shape["projection"])
+    if shape["sort"]:
+        cursor = cursor.sort(shape["sort"])
+    if shape["limit"]:
+        cursor = cursor.limit(shape["limit"])
+    if shape["collation"]:
+        cursor = cursor.collation(shape["collation"])
+    started = time.perf_counter()
+    result = cursor.explain()
+    seconds = time.perf_counter() - started
+
+    winning_plan = result["queryPlanner"]["winningPlan"]
+    stages = plan_stages(winning_plan)
+    execution = result.get("executionStats", {})
+    problems = []
+    if "COLLSCAN" in stages and not shape["allow_scan"]:
+        problems.append("collection scan")
+    if "SORT" in stages and not shape["allow_sort"]:
+        problems.append("in-memory sort")
+    return {
+        "name": shape["name"],
+        "collection": shape["collection"],
+        "stages": stages,
+        "indexes": plan_indexes(winning_plan),
+        "docs_examined": execution.get("totalDocsExamined"),
+        "keys_examined": execution.get("totalKeysExamined"),
+        "returned": execution.get("nReturned"),
+        "seconds": seconds,
+        "problems": problems,
+        "suggested_index": suggest_index(shape) if problems else None,
+    }
+
+
+def audit(db) -> List[dict]:
+    return [explain(db, shape) for shape in QUERY_SHAPES]
+
+
+def seed(db, users=500, ideas=2000):
+    """Sample users and ideas, so the planner has realistic collections to choose plans for"""
+    now = datetime.utcnow()
+    db.users.insert_many([
+        {**db.user_document(f"user{i}", b"not-a-real-hash", f"user{i}@example.com", f"User {i}", credits=i % 10),
+         "created_at": now - timedelta(minutes=i), "last_login": now - timedelta(hours=i % 48)}
+        for i in range(users)
+    ])
+    for i in range(ideas):
+        db.save_business_idea(f"user{i % users}", f"Sample business idea number {i}", b"%PDF-1.4", "report", "en")
+
+
+def print_report(results):
+    for result in results:
+        status = ", ".join(result["problems"]) or "ok"
+        print(f"{result['name']:<32} {status:<32} {' > '.join(result['stages'])}")
+        print(f"{'':<32} indexes: {', '.join(result['indexes']) or '-'}, "
+              f"keys examined {result['keys_examined']}, docs examined {result['docs_examined']}, "
+              f"returned {result['returned']}")
+        if result["suggested_index"]:
+            print(f"{'':<32} suggested index: db.{result['collection']}.create_index({result['suggested_index']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explain the Database layer's queries and flag missing indexes")
+    parser.add_argument("--seed", action="store_true", help="Insert sample users and ideas first")
+    args = parser.parse_args()
+
+    # The audit needs the migrations' indexes, apply them here instead of on a background thread
+    migrations.MIGRATE_ON_START = False
+    db = Database()
+    migrations.migrate(db.db)
+    if args.seed:
+        seed(db)
+    results = audit(db)
+    print_report(results)
+    sys.exit(1 if any(result["problems"] for result in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,174 @@
+import os
 import time
-from datetime import datetime, timedelta
-import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
 from typing import Optional, Tuple
 
+from pymongo import ReturnDocument
+
+
+class MemoryRateLimitStore:
+    """In-process store, bounded to max_keys entries and pruned on access"""
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._windows = OrderedDict()  # key -> (window_index, count, previous_count)
+        self._lockouts = {}
+        self._lock = threading.Lock()
+
+    def increment(self, key: str, window_index: int, window_seconds: int) -> Tuple[int, int]:
+        """Increment the counter for the current window, returns (count, previous_count)"""
+        with self._lock:
+            index, count, previous = self._windows.pop(key, (window_index, 0, 0))
+            index, count, previous = self._roll(index, count, previous, window_index)
+            count += 1
+            self._windows[key] = (index, count, previous)
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+            return count, previous
+
+    def get(self, key: str, window_index: int) -> Tuple[int, int]:
+        """Get (count, previous_count) for the current window"""
+        with self._lock:
+            if key not in self._windows:
+                return 0, 0
+            _, count, previous = self._roll(*self._windows[key], window_index)
+            return count, previous
+
+    def set_lockout(self, key: str, until: float):
+        with self._lock:
+            self._lockouts[key] = until
+            now = time.time()
+            for expired in [k for k, v in self._lockouts.items() if v <= now]:
+                del self._lockouts[expired]
+
+    def get_lockout(self, key: str) -> Optional[float]:
+        with self._lock:
+            until = self._lockouts.get(key)
+            if until is not None and until <= time.time():
+                del self._lockouts[key]
+                return None
+            return until
+
+    def clear(self, key: str):
+        with self._lock:
+            self._windows.pop(key, None)
+            self._lockouts.pop(key, None)
+
+    @staticmethod
+    def _roll(index, count, previous, window_index):
+        if index == window_index:
+            return index, count, previous
+        if index == window_index - 1:
+            return window_index, 0, count
+        return window_index, 0, 0
+
+
+class MongoRateLimitStore:
+    """Store shared between replicas, one document per key and window expired by a TTL index"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def increment(self, key: str, window_index: int, window_seconds: int) -> Tuple[int, int]:
+        """Increment the counter for the current window, returns (count, previous_count)"""
+        doc = self.collection.find_one_and_update(
+            {"_id": f"{key}:{window_index}"},
+            {
+                "$inc": {"count": 1},
+                "$setOnInsert": {
+                    "key": key,
+                    "expires_at": datetime.utcfromtimestamp((window_index + 2) * window_seconds)
+                }
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        previous = self.collection.find_one({"_id": f"{key}:{window_index - 1}"}, {"count": 1})
+        return doc["count"], previous["count"] if previous else 0
+
+    def get(self, key: str, window_index: int) -> Tuple[int, int]:
+        """Get (count, previous_count) for the current window"""
+        counts = {
+            doc["_id"]: doc["count"]
+            for doc in self.collection.find(
+                {"_id": {"$in": [f"{key}:{window_index}", f"{key}:{window_index - 1}"]}},
+                {"count": 1}
+            )
+        }
+        return counts.get(f"{key}:{window_index}", 0), counts.get(f"{key}:{window_index - 1}", 0)
+
+    def set_lockout(self, key: str, until: float):
+        self.collection.update_one(
+            {"_id": f"{key}:lockout"},
+            {"$set": {"key": key, "until": until, "expires_at": datetime.utcfromtimestamp(until)}},
+            upsert=True
+        )
+
+    def get_lockout(self, key: str) -> Optional[float]:
+        doc = self.collection.find_one({"_id": f"{key}:lockout"})
+        # The TTL monitor runs once a minute, so check expiry here as well
+        if doc and doc["until"] > time.time():
+            return doc["until"]
+        return None
+
+    def clear(self, key: str):
+        self.collection.delete_many({"key": key})
+
+
 class RateLimiter:
-    def __init__(self):
-        self.attempts = {}
-        self.lockouts = {}
-        
+    """
+    Sliding window rate limiter with O(1) state per key.
+    The count over the last window is estimated from the current and the
+    previous fixed window, weighted by how far the current window has progressed.
+    """
+
+    def __init__(self, max_attempts: int = 5, window_seconds: int = 300, lockout_seconds: int = 900,
+                 store=None, namespace: str = "login"):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+        self.lockout_seconds = lockout_seconds
+        self.store = store or MemoryRateLimitStore()
+        self.namespace = namespace
+
+    def _key(self, username: str) -> str:
+        return f"{self.namespace}:{username.lower()}"
+
+    def _estimate(self, count: int, previous: int, now: float) -> float:
+        elapsed = now % self.window_seconds
+        return previous * (1 - elapsed / self.window_seconds) + count
+
     def is_locked_out(self, username: str) -> Tuple[bool, Optional[int]]:
-        """Check if a user is locked out"""
-        if username in self.lockouts:
-            lockout_time = self.lockouts[username]
-            if datetime.now() < lockout_time:
-                remaining = int((lockout_time - datetime.now()).total_seconds())
-                return True, remaining
-            else:
-                del self.lockouts[username]
-                if username in self.attempts:
-                    del self.attempts[username]
+        """Check if a user is locked out, returns (locked, remaining seconds)"""
+        until = self.store.get_lockout(self._key(username))
+        if until:
+            return True, int(until - time.time())
         return False, None
 
     def record_attempt(self, username: str) -> Tuple[bool, Optional[int]]:
-        """Record a failed login attempt"""
-        now = datetime.now()
-        
-        if username not in self.attempts:
-            self.attempts[username] = []
-            
-        # Clean old attempts
-        self.attempts[username] = [
-            attempt for attempt in self.attempts[username]
-            if attempt > now - timedelta(minutes=5)
-        ]
-        
-        self.attempts[username].append(now)
-        
-        # If more than 5 attempts in 5 minutes, lock out for 15 minutes
-        if len(self.attempts[username]) >= 5:
-            self.lockouts[username] = now + timedelta(minutes=15)
-            return True, 15
-            
-        return False, None 
\ No newline at end of file
+        """Record an attempt, returns (locked, lockout minutes) once the limit is reached"""
+        key = self._key(username)
+        now = time.time()
+        count, previous = self.store.increment(key, int(now // self.window_seconds), self.window_seconds)
+
+        if self._estimate(count, previous, now) >= self.max_attempts:
+            self.store.set_lockout(key, now + self.lockout_seconds)
+            return True, self.lockout_seconds // 60
+
+        return False, None
+
+    def reset(self, username: str):
+        """Forget attempts and lockouts for a user, e.g. after a successful login"""
+        self.store.clear(self._key(username))
+
+
+def create_rate_limiter(db=None, namespace="login", **kwargs) -> RateLimiter:
+    """Create a rate limiter backed by MongoDB, or in-process when RATE_LIMIT_STORE=memory"""
+    if db is not None and os.getenv("RATE_LIMIT_STORE", "mongo") == "mongo":
+        return RateLimiter(store=MongoRateLimitStore(db.rate_limits), namespace=namespace, **kwargs)
+    return RateLimiter(store=_memory_store, namespace=namespace, **kwargs)
+
+
+# Shared by all sessions in this process
+_memory_store = MemoryRateLimitStore()
@@ -0,0 +1,183 @@
+import base64
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+from pymongo.errors import ConnectionFailure, DuplicateKeyError, OperationFailure, WriteError
+
+from utils.tracing import span, current_span
+
+logger = logging.getLogger(__name__)
+
+# Spool files that can't be decoded or saved are moved here for a closer look
+FAILED_DIR = "failed"
+
+
+class ReportWriter:
+    """
+    Persists finished reports to MongoDB from a background thread.
+    Jobs that still fail after the retries, or that don't fit in the queue,
+    are spooled to disk and replayed once the database is reachable again.
+    """
+
+    def __init__(self, db_factory: Callable, max_queue: int = 100, retries: int = 3, backoff: float = 1.0,
+                 spool_dir: str = "generated_files/spool", replay_interval: float = 30.0):
+        self.db_factory = db_factory
+        self.retries = retries
+        self.backoff = backoff
+        self.spool_dir = spool_dir
+        self.replay_interval = replay_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="report-writer", daemon=True)
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._thread.start()
+
+    def submit(self, job: dict):
+        """Queue a report for saving, without blocking the caller"""
+        # Keep the run's trace, the save happens on the writer thread
+        job["trace_parent"] = current_span()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            logger.warning(f"Report queue full, spooling report {job['idea_id']}")
+            self._spool(job)
+
+    def save(self, job: dict) -> bool:
+        """
+        Save a report on the calling thread, spooling it when the retries fail.
+        Returns whether it reached MongoDB; either way it is durable once this returns.
+        """
+        job["trace_parent"] = current_span()
+        if self._save_with_retries(job):
+            return True
+        self._spool(job)
+        return False
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until all queued reports are handled, returns False on timeout"""
+        deadline = time.monotonic() + timeout if timeout else None
+        while self._queue.unfinished_tasks:
+            if deadline and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def pending_spooled(self) -> int:
+        return len([name for name in os.listdir(self.spool_dir) if name.endswith(".json")])
+
+    def _run(self):
+        self._replay_spool()
+        while True:
+            try:
+                job = self._queue.get(timeout=self.replay_interval)
+            except queue.Empty:
+                self._replay_spool()
+                continue
+            try:
+                if self._save_with_retries(job):
+                    self._replay_spool()
+                else:
+                    self._spool(job)
+            except Exception as e:
+                logger.error(f"Error handling report {job.get('idea_id')}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _save_with_retries(self, job) -> bool:
+        for attempt in range(self.retries):
+            try:
+                self._save(job)
+                return True
+            except Exception as e:
+                logger.warning(f"Saving report {job['idea_id']} failed (attempt {attempt + 1}): {e}")
+                # No wait after the last attempt, the job is spooled right away
+                if attempt < self.retries - 1:
+                    time.sleep(self.backoff * 2 ** attempt)
+        return False
+
+    def _save(self, job):
+        data = dict(job)
+        parent = data.pop("trace_parent", None)
+        pdf_path = data.pop("pdf_path", None)
+        if pdf_path:
+            with open(pdf_path, "rb") as pdf_file:
+                data["pdf_data"] = pdf_file.read()
+        try:
+            with span("report_writer.save", parent=parent, idea_id=job["idea_id"]):
+                self.db_factory().save_business_idea(**data)
+        except DuplicateKeyError:
+            # Already saved by an earlier attempt whose acknowledgement was lost
+            logger.info(f"Report {job['idea_id']} was already saved")
+
+    def _spool(self, job):
+        data = dict(job)
+        data.pop("trace_parent", None)
+        pdf_path = data.pop("pdf_path", None)
+        if pdf_path:
+            with open(pdf_path, "rb") as pdf_file:
+                data["pdf_data"] = pdf_file.read()
+        data["pdf_data"] = base64.b64encode(data["pdf_data"]).decode("ascii")
+
+        path = os.path.join(self.spool_dir, f"{job['idea_id']}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        logger.info(f"Report {job['idea_id']} spooled to {path}")
+
+    def _replay_spool(self):
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.spool_dir, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                data["pdf_data"] = base64.b64decode(data["pdf_data"])
+                self._save(data)
+                os.remove(path)
+                logger.info(f"Spooled report {data['idea_id']} saved")
+            except Exception as e:
+                if _database_unavailable(e):
+                    # Try again on the next replay, later files would fail the same way
+                    logger.warning(f"Replaying spooled report {name} failed: {e}")
+                    return
+                self._quarantine(path, e)
+
+    def _quarantine(self, path, error):
+        """Move a spool file that can never be saved to failed/, so it doesn't hold up the others"""
+        failed_dir = os.path.join(self.spool_dir, FAILED_DIR)
+        os.makedirs(failed_dir, exist_ok=True)
+        os.replace(path, os.path.join(failed_dir, os.path.basename(path)))
+        logger.error(f"Spooled report {os.path.basename(path)} moved to {failed_dir}: {type(error).__name__}: {error}")
+
+
+def _database_unavailable(error) -> bool:
+    """Whether a save failed on the connection or server rather than on the report itself"""
+    if isinstance(error, ConnectionFailure):
+        return True
+    return isinstance(error, OperationFailure) and not isinstance(error, WriteError)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_report_writer(db_factory: Callable) -> ReportWriter:
+    """Process-wide report writer"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ReportWriter(
+                db_factory,
+                max_queue=int(os.getenv("REPORT_QUEUE_SIZE", "100")),
+                retries=int(os.getenv("REPORT_WRITE_RETRIES", "3")),
+                spool_dir=os.getenv("REPORT_SPOOL_DIR", os.path.join("generated_files", "spool"))
+            )
+        return _writer
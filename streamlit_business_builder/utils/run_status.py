@@ -0,0 +1,89 @@
+import logging
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+# A running analysis updates its status at every stage; one that has been quiet
+# for longer than this died with its process
+STALE_AFTER = timedelta(minutes=15)
+
+
+def start_run(db, username, idea_id, idea_text, language):
+    """Record a new analysis run, returns its id"""
+    run_id = str(ObjectId())
+    now = datetime.utcnow()
+    db.run_status.insert_one({
+        "_id": run_id,
+        "username": username,
+        "idea_id": idea_id,
+        "idea_text": idea_text,
+        "language": language,
+        "status": "running",
+        "stage": None,
+        "stage_outputs": {},
+        "queue_position": None,
+        "error": None,
+        "dismissed": False,
+        "started_at": now,
+        "updated_at": now
+    })
+    return run_id
+
+
+def get_run(db, run_id):
+    return db.run_status.find_one({"_id": run_id})
+
+
+def active_run(db, username):
+    """The user's latest run that is still going, or finished without the user having seen it"""
+    try:
+        run = db.run_status.find_one(
+            {"username": username, "dismissed": False},
+            sort=[("updated_at", -1)]
+        )
+        if run and run["status"] == "running" and datetime.utcnow() - run["updated_at"] > STALE_AFTER:
+            RunTracker(db, run["_id"]).fail("Analysis stopped unexpectedly")
+            run = get_run(db, run["_id"])
+        return run
+    except Exception as e:
+        logger.error(f"Error getting active run for user {username}: {e}")
+        return None
+
+
+def dismiss_run(db, run_id):
+    db.run_status.update_one({"_id": run_id}, {"$set": {"dismissed": True}})
+
+
+class RunTracker:
+    """Writes the progress of one analysis run to its run status document"""
+
+    def __init__(self, db, run_id):
+        self.db = db
+        self.run_id = run_id
+
+    def _update(self, fields):
+        try:
+            fields["updated_at"] = datetime.utcnow()
+            self.db.run_status.update_one({"_id": self.run_id}, {"$set": fields})
+        except Exception as e:
+            # Progress is informational, never fail the analysis over it
+            logger.warning(f"Error updating run {self.run_id}: {e}")
+
+    def stage(self, stage):
+        self._update({"stage": stage})
+
+    def queue_position(self, position):
+        """Position of the current stage's call in the LLM queue, None once it has a slot"""
+        self._update({"queue_position": position})
+
+    def stage_done(self, stage, output):
+        self._update({f"stage_outputs.{stage}": output})
+
+    def finish(self, txt_digest, pdf_digest):
+        """Mark the run done with the digests of its reports in the artifact store"""
+        self._update({"status": "done", "stage": None, "artifacts": {"txt": txt_digest, "pdf": pdf_digest}})
+
+    def fail(self, error):
+        self._update({"status": "failed", "error": str(error), "error_type": type(error).__name__})
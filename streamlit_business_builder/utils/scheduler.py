@@ -0,0 +1,147 @@
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+# Share of LLM capacity per plan, users without a plan get weight 1
+PLAN_WEIGHTS = {
+    "free": 1,
+    "pro": 2,
+    "premium": 4
+}
+PLANS = list(PLAN_WEIGHTS)
+DEFAULT_PLAN = "free"
+
+
+def plan_weight(user: Optional[dict]) -> int:
+    """Scheduling weight for a user document"""
+    if not user:
+        return 1
+    return PLAN_WEIGHTS.get(user.get("plan"), 1)
+
+
+class QueueTimeout(TimeoutError):
+    """Raised when a request waited longer than the queue timeout"""
+
+
+class _Ticket:
+    __slots__ = ("username", "start", "finish", "seq")
+
+    def __init__(self, username, start, finish, seq):
+        self.username = username
+        self.start = start
+        self.finish = finish
+        self.seq = seq
+
+    def sort_key(self):
+        return self.finish, self.seq
+
+
+class LLMScheduler:
+    """
+    Admission control for LLM calls with a global in-flight limit.
+    Waiting calls are ordered by weighted fair queuing: every user gets a
+    virtual finish time of max(virtual clock, their last finish) + 1/weight,
+    so a user with many queued calls cannot starve the others.
+    """
+
+    def __init__(self, max_in_flight: int = 4, queue_timeout: Optional[float] = None):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = []
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._seq = itertools.count()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_length(self) -> int:
+        return len(self._waiting)
+
+    @contextmanager
+    def slot(self, username: str, weight: float = 1, on_position: Optional[Callable[[int], None]] = None,
+             poll_interval: float = 1.0):
+        """Block until the caller may run an LLM call, reporting queue positions while waiting"""
+        ticket = self._enqueue(username, weight)
+        try:
+            self._wait(ticket, on_position, poll_interval)
+        except BaseException:
+            with self._cond:
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+            raise
+        try:
+            yield
+        finally:
+            self._release(username)
+
+    def position(self, ticket) -> int:
+        """1-based position of a waiting ticket"""
+        return sorted(self._waiting, key=_Ticket.sort_key).index(ticket) + 1
+
+    def _enqueue(self, username, weight):
+        with self._cond:
+            start = max(self._virtual_time, self._last_finish.get(username, 0.0))
+            ticket = _Ticket(username, start, start + 1.0 / max(weight, 0.001), next(self._seq))
+            self._last_finish[username] = ticket.finish
+            self._waiting.append(ticket)
+            return ticket
+
+    def _wait(self, ticket, on_position, poll_interval):
+        deadline = time.monotonic() + self.queue_timeout if self.queue_timeout else None
+        last_position = None
+        while True:
+            with self._cond:
+                if self._in_flight < self.max_in_flight and min(self._waiting, key=_Ticket.sort_key) is ticket:
+                    self._waiting.remove(ticket)
+                    self._in_flight += 1
+                    self._virtual_time = max(self._virtual_time, ticket.start)
+                    return
+                position = self.position(ticket)
+
+            if on_position and position != last_position:
+                on_position(position)
+                last_position = position
+            if deadline and time.monotonic() > deadline:
+                raise QueueTimeout(f"Waited more than {self.queue_timeout}s for an LLM slot")
+
+            with self._cond:
+                self._cond.wait(poll_interval)
+
+    def _release(self, username):
+        with self._cond:
+            self._in_flight -= 1
+            # Forget users that have nothing queued and are not ahead of the clock
+            waiting_users = {t.username for t in self._waiting}
+            for name in [n for n, finish in self._last_finish.items()
+                         if n not in waiting_users and finish <= self._virtual_time]:
+                del self._last_finish[name]
+            self._cond.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(api_keys: int = 1) -> LLMScheduler:
+    """
+    Process-wide scheduler shared by all Streamlit sessions.
+    LLM_MAX_IN_FLIGHT applies per API key, so capacity grows with the keys provisioned.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            timeout = os.getenv("LLM_QUEUE_TIMEOUT", "600")
+            _scheduler = LLMScheduler(
+                max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "4")) * max(1, api_keys),
+                queue_timeout=float(timeout) if timeout else None
+            )
+        return _scheduler
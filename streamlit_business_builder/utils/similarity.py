@@ -0,0 +1,65 @@
+import hashlib
+import re
+import struct
+from typing import List
+
+# 32 bands of 4 rows: ideas with a Jaccard similarity of about 0.5 or more
+# share at least one band with high probability
+NUM_BANDS = 32
+ROWS_PER_BAND = 4
+NUM_PERM = NUM_BANDS * ROWS_PER_BAND
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+def _permutations():
+    """Fixed hash parameters, so signatures stay comparable across processes"""
+    params = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"minhash-{i}".encode(), digest_size=16).digest()
+        a, b = struct.unpack("<QQ", digest)
+        params.append((a % (_MERSENNE_PRIME - 1) + 1, b % _MERSENNE_PRIME))
+    return params
+
+
+_PERMUTATIONS = _permutations()
+
+
+def shingles(text: str) -> set:
+    """Word unigrams and bigrams of the normalized text"""
+    words = re.findall(r"\w+", text.lower())
+    result = set(words)
+    result.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return result
+
+
+def minhash(text: str) -> List[int]:
+    """MinHash signature of a text"""
+    hashes = [
+        struct.unpack("<Q", hashlib.blake2b(s.encode(), digest_size=8).digest())[0]
+        for s in shingles(text)
+    ]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERM
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def lsh_bands(signature: List[int]) -> List[str]:
+    """Band keys used to look up candidate duplicates through an index"""
+    keys = []
+    for band in range(NUM_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(struct.pack(f"<{ROWS_PER_BAND}Q", *rows), digest_size=8).hexdigest()
+        keys.append(f"{band}:{digest}")
+    return keys
+
+
+def estimate_similarity(signature_a: List[int], signature_b: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    if not signature_a or len(signature_a) != len(signature_b):
+        return 0.0
+    return sum(a == b for a, b in zip(signature_a, signature_b)) / len(signature_a)
@@ -0,0 +1,205 @@
+"""
+Lightweight tracing for analysis runs.
+
+Spans are written as one JSON object per line, using the OTLP JSON field names
+(traceId, spanId, parentSpanId, startTimeUnixNano, ...), to TRACE_FILE when
+TRACING_ENABLED is set. With tracing off, span() returns a shared no-op object.
+
+    python -m utils.tracing generated_files/traces.jsonl   # print span trees
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import defaultdict
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+_enabled = os.getenv("TRACING_ENABLED", "").lower() in ("1", "true", "yes")
+_trace_file = os.getenv("TRACE_FILE", os.path.join("generated_files", "traces.jsonl"))
+_write_lock = threading.Lock()
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def configure(enabled, trace_file=None):
+    """Turn tracing on or off at runtime"""
+    global _enabled, _trace_file
+    _enabled = enabled
+    if trace_file:
+        _trace_file = trace_file
+
+
+def is_enabled():
+    return _enabled
+
+
+class Span:
+    def __init__(self, name, parent=None, attributes=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.parent_id = parent.span_id if parent else None
+        self.span_id = secrets.token_hex(8)
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def end(self, error=None):
+        self.end_ns = time.time_ns()
+        self.error = error
+        _export(self)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        self.end(repr(exc) if exc else None)
+        return False
+
+    def to_dict(self):
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "durationMs": (self.end_ns - self.start_ns) / 1e6,
+            "attributes": self.attributes,
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"}
+        }
+
+
+class _NoopSpan:
+    def set_attribute(self, key, value):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name, parent=None, **attributes):
+    """Context manager for a span, child of the current span or of `parent`"""
+    if not _enabled:
+        return _NOOP_SPAN
+    return Span(name, parent or _current_span.get(), attributes)
+
+
+def current_span():
+    """The active span, to hand over to work that continues in another thread"""
+    return _current_span.get() if _enabled else None
+
+
+def traced(name=None):
+    """Decorator that wraps each call of a function in a span"""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(span_name, _current_span.get()):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _export(finished):
+    try:
+        line = json.dumps(finished.to_dict(), default=str)
+        with _write_lock:
+            directory = os.path.dirname(_trace_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(_trace_file, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except Exception as e:
+        logger.warning(f"Error exporting span {finished.name}: {e}")
+
+
+class MongoCommandTracer(monitoring.CommandListener):
+    """Records every MongoDB command as a child span of the span that issued it"""
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        parent = _current_span.get()
+        if not _enabled or parent is None:
+            return
+        command_span = Span(f"mongo.{event.command_name}", parent, {
+            "db.system": "mongodb",
+            "db.name": event.database_name,
+            "db.operation": event.command_name
+        })
+        collection = event.command.get(event.command_name)
+        if isinstance(collection, str):
+            command_span.set_attribute("db.collection", collection)
+        with self._lock:
+            self._pending[(event.request_id, event.connection_id)] = command_span
+
+    def _finish(self, event, error=None):
+        with self._lock:
+            command_span = self._pending.pop((event.request_id, event.connection_id), None)
+        if command_span:
+            command_span.set_attribute("db.server_duration_ms", event.duration_micros / 1000)
+            command_span.end(error)
+
+    def succeeded(self, event):
+        self._finish(event)
+
+    def failed(self, event):
+        self._finish(event, str(event.failure))
+
+
+def mongo_event_listeners():
+    """Event listeners for MongoClient, empty when tracing is off"""
+    return [MongoCommandTracer()] if _enabled else []
+
+
+def print_trace_trees(path):
+    """Print every trace in a JSONL file as an indented tree"""
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                spans.append(json.loads(line))
+
+    children = defaultdict(list)
+    for s in spans:
+        children[s["parentSpanId"]].append(s)
+
+    def show(s, depth):
+        status = "" if s["status"]["code"] == "OK" else f"  [{s['status']['message']}]"
+        print(f"{'  ' * depth}{s['name']:<{48 - 2 * depth}} {s['durationMs']:>10.1f} ms{status}")
+        for child in sorted(children[s["spanId"]], key=lambda c: c["startTimeUnixNano"]):
+            show(child, depth + 1)
+
+    for root in sorted(children[None], key=lambda s: s["startTimeUnixNano"]):
+        print(f"trace {root['traceId']}")
+        show(root, 1)
+
+
+if __name__ == "__main__":
+    print_trace_trees(sys.argv[1] if len(sys.argv) > 1 else _trace_file)
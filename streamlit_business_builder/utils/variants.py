@@ -0,0 +1,61 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+from utils.client_pool import parse_list
+from utils.scheduler import DEFAULT_PLAN
+
+# Premium analyses generate BEST_OF_N variants of these stages at once and keep the best
+BEST_OF_N = int(os.getenv("BEST_OF_N", "3"))
+BEST_OF_N_STAGES = parse_list(os.getenv("BEST_OF_N_STAGES", "strategy"))
+BEST_OF_N_PLANS = parse_list(os.getenv("BEST_OF_N_PLANS", "premium"))
+
+# Temperature difference between neighbouring variants
+TEMPERATURE_SPREAD = 0.2
+
+_PROMPT_SECTION = re.compile(r"(?m)^(\d+)\. \S")
+# "1. ", "### 1. ", "**1. " or "1) " at the start of a line
+_OUTPUT_SECTION = re.compile(r"(?m)^\s*(?:#+\s*)?(?:\*\*)?(\d{1,2})[.)]\s")
+
+
+def plan_variants(user: Optional[dict]) -> int:
+    """Variants per best-of-N stage for a user document, by the plan set in user management"""
+    if user and user.get("plan", DEFAULT_PLAN) in BEST_OF_N_PLANS:
+        return max(1, BEST_OF_N)
+    return 1
+
+
+def variant_temperatures(base: float, count: int) -> List[float]:
+    """Temperatures spread around the agent's own, e.g. 0.6, 0.8, 1.0 for three variants of 0.8"""
+    offset = (count - 1) / 2
+    return [round(min(2.0, max(0.0, base + (i - offset) * TEMPERATURE_SPREAD)), 2) for i in range(count)]
+
+
+def required_sections(prompt: str) -> set:
+    """Numbers of the top level sections a prompt asks for"""
+    return set(_PROMPT_SECTION.findall(prompt))
+
+
+def score_output(text: str, prompt: str, budget_hit: bool = False, require_todo: bool = False,
+                 target_chars: int = 8000) -> Tuple[float, dict]:
+    """
+    Cheap quality score of an agent output between 0 and 1: coverage of the prompt's numbered
+    sections, length up to target_chars and, where the PDF needs it, a TO-DO list.
+    Section numbers are matched rather than headings, so Dutch outputs score the same.
+    Returns: (score, details)
+    """
+    required = required_sections(prompt)
+    found = required & set(_OUTPUT_SECTION.findall(text))
+    coverage = len(found) / len(required) if required else 1.0
+    length = min(len(text) / target_chars, 1.0) if target_chars else 1.0
+    has_todo = "TO-DO:" in text
+
+    if require_todo:
+        score = 0.6 * coverage + 0.2 * length + 0.2 * has_todo
+    else:
+        score = 0.6 * coverage + 0.4 * length
+    if budget_hit:
+        # A cut off output misses its last sections even when the numbers are there
+        score *= 0.8
+    details = {"coverage": round(coverage, 3), "length": len(text), "todo": has_todo, "budget_hit": budget_hit}
+    return round(score, 4), details
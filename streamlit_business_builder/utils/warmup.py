@@ -0,0 +1,227 @@
+"""
+Open the LLM and MongoDB connection pools before the first report needs them, and keep them open.
+Without it the first report after a deploy or a quiet period pays for DNS lookups, TLS handshakes
+and MongoDB server selection on top of its own calls.
+
+    python -m utils.warmup                                      # probe the configured endpoints once
+    python -m utils.warmup --llm-base-url http://localhost:8000/v1 --mongo-uri mongodb://localhost:27017
+
+The probes are cheap: a model listing per LLM client and a MongoDB ping. The app starts them after
+the first login, so the login page doesn't wait for the OpenAI SDK to load. With HEALTH_PORT set,
+GET /health on that port returns the latest results as JSON, status 200 when both pools answer
+and 503 otherwise; the first health check starts the warm-up if no login has yet.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+# Connections opened per LLM client, one for each stage that runs in parallel
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", "4"))
+# Seconds between probes that keep idle connections open, 0 disables; keep it below LLM_KEEPALIVE_EXPIRY
+KEEPALIVE_INTERVAL = float(os.getenv("WARMUP_KEEPALIVE_SECONDS", "60"))
+PROBE_TIMEOUT = float(os.getenv("WARMUP_PROBE_TIMEOUT", "10"))
+HEALTH_PORT = int(os.getenv("HEALTH_PORT", "0"))
+
+_status = {}
+_status_lock = threading.Lock()
+_started = False
+_health_started = False
+_start_lock = threading.Lock()
+
+
+def _result(started: float, error: Exception = None) -> dict:
+    return {
+        "ok": error is None,
+        "ms": round((time.perf_counter() - started) * 1000, 1),
+        "error": f"{type(error).__name__}: {error}" if error else None,
+        "checked_at": datetime.utcnow().isoformat(timespec="seconds"),
+    }
+
+
+def probe_llm(pools: List, connections: int = WARMUP_CONNECTIONS) -> dict:
+    """
+    List the models on every client of the given ClientPools, `connections` requests at once per client,
+    so that many connections stay open in each client's pool. Healthy when any client answers.
+    """
+    members = [member for pool in pools for member in pool.clients()]
+
+    def probe(client):
+        started = time.perf_counter()
+        try:
+            client.with_options(timeout=PROBE_TIMEOUT, max_retries=0).models.list()
+            return _result(started)
+        except Exception as e:
+            return _result(started, e)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(members) * connections)) as executor:
+        futures = [(name, executor.submit(probe, client)) for name, client in members for _ in range(connections)]
+        clients = {}
+        for name, future in futures:
+            result = future.result()
+            # Keep the slowest answer, or the failure, of each client
+            if name not in clients or not result["ok"] or clients[name]["ok"] and result["ms"] > clients[name]["ms"]:
+                clients[name] = result
+
+    ok = any(result["ok"] for result in clients.values())
+    return {"ok": ok, "ms": max((r["ms"] for r in clients.values()), default=0.0), "clients": clients}
+
+
+def probe_mongo(client) -> dict:
+    """Ping MongoDB, which selects a server and opens a pooled connection"""
+    started = time.perf_counter()
+    try:
+        client.admin.command("ping")
+        return _result(started)
+    except Exception as e:
+        return _result(started, e)
+
+
+def warm_up(get_pools: Callable[[], List], get_mongo_client: Callable[[], object],
+            connections: int = WARMUP_CONNECTIONS) -> dict:
+    """Probe both pools at once and record the results for health()"""
+    def llm():
+        try:
+            return probe_llm(get_pools(), connections)
+        except Exception as e:
+            # Missing API key secrets and the like
+            return _result(time.perf_counter(), e)
+
+    def mongo():
+        try:
+            return probe_mongo(get_mongo_client())
+        except Exception as e:
+            return _result(time.perf_counter(), e)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        llm_future, mongo_future = executor.submit(llm), executor.submit(mongo)
+        results = {"llm": llm_future.result(), "mongo": mongo_future.result()}
+
+    with _status_lock:
+        _status.update(results)
+    for name, result in results.items():
+        if not result["ok"]:
+            error = result.get("error") or "; ".join(
+                f"{client}: {r['error']}" for client, r in result.get("clients", {}).items() if r["error"])
+            logger.warning(f"Warm-up probe of {name} failed: {error}")
+    return results
+
+
+def health() -> dict:
+    """Latest probe results, not ok until the first warm-up has finished"""
+    with _status_lock:
+        checks = dict(_status)
+    return {"ok": bool(checks) and all(check["ok"] for check in checks.values()), "checks": checks}
+
+
+class _HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/health":
+            self.send_error(404)
+            return
+        if self.server.on_request:
+            self.server.on_request()
+        status = health()
+        body = json.dumps(status).encode("utf-8")
+        self.send_response(200 if status["ok"] else 503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Health checks arrive every few seconds, don't log each
+        pass
+
+
+def serve_health(port: int = HEALTH_PORT, on_request: Callable[[], object] = None) -> ThreadingHTTPServer:
+    """Serve GET /health on `port` from a daemon thread, calling `on_request` before answering each check"""
+    server = ThreadingHTTPServer(("", port), _HealthHandler)
+    server.on_request = on_request
+    threading.Thread(target=server.serve_forever, name="health-server", daemon=True).start()
+    logger.info(f"Health endpoint listening on port {server.server_address[1]}")
+    return server
+
+
+def start_warmup(get_pools: Callable[[], List], get_mongo_client: Callable[[], object]) -> bool:
+    """
+    Warm up both pools in the background once per process, then probe them every KEEPALIVE_INTERVAL
+    seconds so idle connections aren't closed. Returns False when it was already started.
+    """
+    global _started
+    with _start_lock:
+        if _started or not WARMUP_ENABLED:
+            return False
+        _started = True
+
+    def run():
+        results = warm_up(get_pools, get_mongo_client)
+        logger.info(f"Warm-up finished: LLM {results['llm']['ms']:.0f} ms, MongoDB {results['mongo']['ms']:.0f} ms")
+        while KEEPALIVE_INTERVAL > 0:
+            time.sleep(KEEPALIVE_INTERVAL)
+            # As many requests at once as at start, one request only keeps one connection per client open
+            # and parallel stages after a quiet period would pay for new handshakes again
+            warm_up(get_pools, get_mongo_client)
+
+    threading.Thread(target=run, name="warmup", daemon=True).start()
+    return True
+
+
+def start_health(get_pools: Callable[[], List], get_mongo_client: Callable[[], object]) -> bool:
+    """
+    Serve GET /health on HEALTH_PORT once per process. A health check also starts the warm-up,
+    which would otherwise wait for the first login. Returns False when not configured or already started.
+    """
+    global _health_started
+    with _start_lock:
+        if _health_started or not HEALTH_PORT:
+            return False
+        _health_started = True
+    try:
+        serve_health(HEALTH_PORT, on_request=lambda: start_warmup(get_pools, get_mongo_client))
+    except OSError as e:
+        logger.error(f"Error starting health endpoint on port {HEALTH_PORT}: {e}")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe the LLM and MongoDB connections once")
+    parser.add_argument("--llm-base-url", help="Probe this OpenAI compatible endpoint instead of the configured ones")
+    parser.add_argument("--api-key", default=os.getenv("DEEPSEEK_API_KEY", "local"),
+                        help="API key for --llm-base-url")
+    parser.add_argument("--mongo-uri", help="Ping this MongoDB instead of MONGODB_URI")
+    parser.add_argument("--connections", type=int, default=1, help="Requests at once per LLM client")
+    args = parser.parse_args()
+
+    from dotenv import load_dotenv
+
+    from utils.client_pool import ClientPool, http_client
+    from utils.database import get_client
+
+    load_dotenv()
+    if args.llm_base_url:
+        from openai import OpenAI
+
+        client = OpenAI(api_key=args.api_key, base_url=args.llm_base_url, http_client=http_client())
+        pool = ClientPool([(f"local@{args.llm_base_url}", "local", client)])
+        get_pools = lambda: [pool]
+    else:
+        from main import get_client_pools as get_pools
+
+    results = warm_up(get_pools, lambda: get_client(args.mongo_uri or os.getenv("MONGODB_URI")), args.connections)
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if health()["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()